@@ -1,3 +1,4 @@
 from .firebase import get_db
+from . import settings
 
-__all__ = ["get_db"]
+__all__ = ["get_db", "settings"]
@@ -0,0 +1,55 @@
+"""Application settings loaded from environment variables."""
+import os
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    """Read a boolean flag from the environment."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Local read replica of Firestore collections
+REPLICA_ENABLED = _env_bool("REPLICA_ENABLED")
+REPLICA_PATH = os.getenv("REPLICA_PATH", "replica.sqlite3")
+REPLICA_MAX_STALENESS = float(os.getenv("REPLICA_MAX_STALENESS", "300"))
+REPLICA_LISTEN = _env_bool("REPLICA_LISTEN", default=True)
+REPLICA_SYNC_INTERVAL = float(os.getenv("REPLICA_SYNC_INTERVAL", "60"))
+# Polling mode: how often to diff document IDs to find deletes, and how far
+# back each delta re-reads to absorb client clock skew in `updatedAt`
+REPLICA_RECONCILE_INTERVAL = float(os.getenv("REPLICA_RECONCILE_INTERVAL", "3600"))
+REPLICA_CLOCK_SKEW = float(os.getenv("REPLICA_CLOCK_SKEW", "300"))
+
+# Background report generation
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_OUTPUT_DIR = os.getenv("REPORT_OUTPUT_DIR", "reports")
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "600"))
+
+# Admission control and rate limiting
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "10"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "20"))
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32"))
+ADMISSION_WRITE_CONCURRENCY = int(os.getenv("ADMISSION_WRITE_CONCURRENCY", "16"))
+ADMISSION_READ_CONCURRENCY = int(os.getenv("ADMISSION_READ_CONCURRENCY", "16"))
+ADMISSION_SCAN_CONCURRENCY = int(os.getenv("ADMISSION_SCAN_CONCURRENCY", "4"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+# Extra caps per route, e.g. "GET /api/staff/with-cars=2,PATCH /api/cars/bulk=1"
+ADMISSION_ROUTE_LIMITS = os.getenv("ADMISSION_ROUTE_LIMITS", "PATCH /api/cars/bulk=2,POST /api/archive/run=1")
+# Proxies (addresses or CIDR ranges) whose X-Forwarded-For header is trusted
+TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", "")
+
+# Archival of sold cars
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+
+# Firestore call deadlines, retries and hedged reads
+FIRESTORE_READ_DEADLINE = float(os.getenv("FIRESTORE_READ_DEADLINE", "5"))
+FIRESTORE_QUERY_DEADLINE = float(os.getenv("FIRESTORE_QUERY_DEADLINE", "30"))
+FIRESTORE_WRITE_DEADLINE = float(os.getenv("FIRESTORE_WRITE_DEADLINE", "10"))
+FIRESTORE_MAX_ATTEMPTS = int(os.getenv("FIRESTORE_MAX_ATTEMPTS", "4"))
+FIRESTORE_BACKOFF_BASE = float(os.getenv("FIRESTORE_BACKOFF_BASE", "0.1"))
+FIRESTORE_BACKOFF_MAX = float(os.getenv("FIRESTORE_BACKOFF_MAX", "2"))
+FIRESTORE_HEDGE_ENABLED = _env_bool("FIRESTORE_HEDGE_ENABLED", default=True)
+FIRESTORE_HEDGE_PERCENTILE = float(os.getenv("FIRESTORE_HEDGE_PERCENTILE", "95"))
+FIRESTORE_HEDGE_DEFAULT_DELAY = float(os.getenv("FIRESTORE_HEDGE_DEFAULT_DELAY", "0.1"))
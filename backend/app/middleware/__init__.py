@@ -0,0 +1,3 @@
+from .admission import AdmissionMiddleware, AdmissionController, admission_controller
+
+__all__ = ["AdmissionMiddleware", "AdmissionController", "admission_controller"]
@@ -0,0 +1,372 @@
+"""Admission control: per-client rate limiting, concurrency caps and load shedding."""
+import asyncio
+import heapq
+import ipaddress
+import itertools
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from fastapi.responses import JSONResponse
+from app.config import settings
+
+# Request classes in priority order: lower value is admitted first
+PRIORITIES = {"write": 0, "read": 1, "scan": 2}
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Collection listings that scan everything unless a limit is given
+UNBOUNDED_LIST_PATHS = {"/api/cars", "/api/cars/", "/api/staff", "/api/staff/"}
+
+# Endpoints that always scan a whole collection
+SCAN_PATHS = {"/api/staff/search", "/api/staff/with-cars"}
+
+# Paths never subject to admission control
+EXEMPT_PATHS = {"/", "/docs", "/redoc", "/openapi.json"}
+EXEMPT_PREFIXES = ("/api/metrics",)
+
+MAX_TRACKED_CLIENTS = 10000
+
+# Queue entry: (priority, sequence, request class, route key, admission future)
+Waiter = Tuple[int, int, str, Optional[str], asyncio.Future]
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token. Returns 0 on success, otherwise seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Track in-flight requests and decide which requests to admit, queue or shed."""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_concurrency: int,
+        class_limits: Dict[str, int],
+        max_queue: int,
+        queue_timeout: float,
+        route_limits: Optional[Dict[str, int]] = None
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.class_limits = class_limits
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.route_limits = route_limits or {}
+        self._routes = [
+            (key.split(" ", 1)[0], _template_pattern(key.split(" ", 1)[1]), key)
+            for key in self.route_limits
+        ]
+        self._route_active = {key: 0 for key in self.route_limits}
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._active = {name: 0 for name in PRIORITIES}
+        self._waiters: List[Waiter] = []
+        self._sequence = itertools.count()
+        self.admitted = {name: 0 for name in PRIORITIES}
+        self.shed = {"rate_limited": 0, "queue_full": 0, "queue_timeout": 0, "evicted": 0}
+
+    @classmethod
+    def from_settings(cls) -> "AdmissionController":
+        return cls(
+            rate=settings.RATE_LIMIT_PER_SECOND,
+            burst=settings.RATE_LIMIT_BURST,
+            max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+            class_limits={
+                "write": settings.ADMISSION_WRITE_CONCURRENCY,
+                "read": settings.ADMISSION_READ_CONCURRENCY,
+                "scan": settings.ADMISSION_SCAN_CONCURRENCY,
+            },
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+            route_limits=parse_route_limits(settings.ADMISSION_ROUTE_LIMITS),
+        )
+
+    def route_for(self, method: str, path: str) -> Optional[str]:
+        """Find the capped route template a request matches, if any."""
+        for route_method, pattern, key in self._routes:
+            if route_method == method and pattern.fullmatch(path.rstrip("/") or "/"):
+                return key
+        return None
+
+    def check_rate(self, client: str):
+        """Charge one token to the client or raise a 429 rejection."""
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+
+        wait = bucket.take()
+        if wait:
+            self.shed["rate_limited"] += 1
+            raise AdmissionRejected(429, "Too many requests", wait)
+
+    def _can_run(self, request_class: str, route: Optional[str] = None) -> bool:
+        return (
+            sum(self._active.values()) < self.max_concurrency
+            and self._active[request_class] < self.class_limits[request_class]
+            and (route is None or self._route_active[route] < self.route_limits[route])
+        )
+
+    def _start(self, request_class: str, route: Optional[str] = None):
+        self._active[request_class] += 1
+        self.admitted[request_class] += 1
+        if route is not None:
+            self._route_active[route] += 1
+
+    async def acquire(self, request_class: str, route: Optional[str] = None):
+        """Wait for a slot, or raise a 503 rejection when the queue is full or too slow."""
+        if self._can_run(request_class, route) and not self._has_waiters_ahead(request_class):
+            self._start(request_class, route)
+            return
+
+        if len(self._waiters) >= self.max_queue and not self._evict_below(request_class):
+            self.shed["queue_full"] += 1
+            raise AdmissionRejected(503, "Server is busy", self.queue_timeout)
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (PRIORITIES[request_class], next(self._sequence), request_class, route, future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done():
+                # Admitted (or evicted) at the last moment
+                return future.result()
+            self._drop(entry)
+            self.shed["queue_timeout"] += 1
+            raise AdmissionRejected(503, "Server is busy", self.queue_timeout)
+        except asyncio.CancelledError:
+            # Client went away while queued
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release(request_class, route)
+            else:
+                self._drop(entry)
+            raise
+
+    def _has_waiters_ahead(self, request_class: str) -> bool:
+        """Check for queued requests that should be admitted before this one."""
+        priority = PRIORITIES[request_class]
+        for waiter_priority, _, waiter_class, waiter_route, future in self._waiters:
+            if future.done() or waiter_priority > priority:
+                continue
+            # A waiter only goes first if its own caps have room
+            if self._active[waiter_class] < self.class_limits[waiter_class] and (
+                waiter_route is None or self._route_active[waiter_route] < self.route_limits[waiter_route]
+            ):
+                return True
+        return False
+
+    def _evict_below(self, request_class: str) -> bool:
+        """Make room in a full queue by shedding the newest lower-priority waiter."""
+        priority = PRIORITIES[request_class]
+        candidates = [
+            entry for entry in self._waiters
+            if entry[0] > priority and not entry[4].done()
+        ]
+        if not candidates:
+            return False
+        victim = max(candidates, key=lambda entry: (entry[0], entry[1]))
+        victim[4].set_exception(AdmissionRejected(503, "Server is busy", self.queue_timeout))
+        self._waiters.remove(victim)
+        heapq.heapify(self._waiters)
+        self.shed["evicted"] += 1
+        return True
+
+    def _drop(self, entry: Waiter):
+        entry[4].cancel()
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+
+    def release(self, request_class: str, route: Optional[str] = None):
+        """Free a slot and admit queued requests in priority order."""
+        self._active[request_class] -= 1
+        if route is not None:
+            self._route_active[route] -= 1
+        skipped = []
+        while self._waiters:
+            entry = heapq.heappop(self._waiters)
+            waiter_class, waiter_route, future = entry[2], entry[3], entry[4]
+            if future.done():
+                continue
+            if self._can_run(waiter_class, waiter_route):
+                self._start(waiter_class, waiter_route)
+                future.set_result(None)
+            else:
+                skipped.append(entry)
+                if sum(self._active.values()) >= self.max_concurrency:
+                    break
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    def get_stats(self) -> dict:
+        """Describe queue depth, in-flight requests and shed counts."""
+        queued = {name: 0 for name in PRIORITIES}
+        for _, _, request_class, _, future in self._waiters:
+            if not future.done():
+                queued[request_class] += 1
+        return {
+            "queue_depth": sum(queued.values()),
+            "queued": queued,
+            "active": dict(self._active),
+            "active_routes": dict(self._route_active),
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+            "tracked_clients": len(self._buckets),
+            "limits": {
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "queue_timeout_seconds": self.queue_timeout,
+                **{f"{name}_concurrency": limit for name, limit in self.class_limits.items()},
+                "routes": dict(self.route_limits),
+            },
+        }
+
+
+def classify_request(method: str, path: str, query_string: bytes) -> str:
+    """Classify a request as a write, a point read or an expensive scan."""
+    if method in WRITE_METHODS:
+        return "write"
+    if path in SCAN_PATHS:
+        return "scan"
+    if path in UNBOUNDED_LIST_PATHS and "limit" not in parse_qs(query_string.decode("latin-1")):
+        return "scan"
+    return "read"
+
+
+def parse_route_limits(spec: str) -> Dict[str, int]:
+    """Parse "METHOD /path/{param}=N" entries separated by commas."""
+    limits = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        route, limit = entry.rsplit("=", 1)
+        method, template = route.split()
+        limits[f"{method.upper()} {template.rstrip('/') or '/'}"] = int(limit)
+    return limits
+
+
+def _template_pattern(template: str) -> "re.Pattern":
+    parts = re.split(r"(\{[^/]+\})", template)
+    return re.compile("".join(
+        "[^/]+" if part.startswith("{") else re.escape(part) for part in parts
+    ))
+
+
+def parse_trusted_proxies(spec: str) -> List:
+    """Parse comma-separated proxy addresses or CIDR ranges."""
+    return [
+        ipaddress.ip_network(entry.strip(), strict=False)
+        for entry in spec.split(",")
+        if entry.strip()
+    ]
+
+
+def _is_trusted(address: str, proxies: List) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in proxies)
+
+
+def get_client_id(scope: dict, trusted_proxies: Optional[List] = None) -> str:
+    """Identify the client by socket peer, or by X-Forwarded-For behind trusted proxies.
+
+    The forwarded chain is walked right to left and the first address not
+    belonging to a trusted proxy is used, so clients cannot spoof their ID.
+    """
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    if trusted_proxies is None:
+        trusted_proxies = TRUSTED_PROXIES
+    if not trusted_proxies or not _is_trusted(peer, trusted_proxies):
+        return peer
+
+    forwarded = [
+        address.strip()
+        for name, value in scope.get("headers", [])
+        if name == b"x-forwarded-for"
+        for address in value.decode("latin-1").split(",")
+        if address.strip()
+    ]
+    for address in reversed(forwarded):
+        if not _is_trusted(address, trusted_proxies):
+            return address
+    return forwarded[0] if forwarded else peer
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying the admission controller to API requests."""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if (
+            scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or path in EXEMPT_PATHS
+            or path.startswith(EXEMPT_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        request_class = classify_request(scope["method"], path, scope.get("query_string", b""))
+        route = self.controller.route_for(scope["method"], path)
+        try:
+            self.controller.check_rate(get_client_id(scope))
+            await self.controller.acquire(request_class, route)
+        except AdmissionRejected as rejection:
+            response = JSONResponse(
+                {"detail": rejection.detail},
+                status_code=rejection.status_code,
+                headers={"Retry-After": str(max(1, math.ceil(rejection.retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(request_class, route)
+
+
+TRUSTED_PROXIES = parse_trusted_proxies(settings.TRUSTED_PROXIES)
+admission_controller = AdmissionController.from_settings()
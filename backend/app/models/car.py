@@ -2,11 +2,31 @@
 from typing import Optional, List
 from datetime import datetime
 
+# Import lifecycle the frontend moves cars through, in order
+STATUS_PIPELINE = ["in_korea", "shipping", "at_port", "customs", "in_stock", "sold"]
+
 class CarModel:
     """Car data model."""
     
     COLLECTION_NAME = "cars"
     
+    # The frontend stores and parses `soldDate` as a plain date string
+    SOLD_DATE_FORMAT = "%Y-%m-%d"
+    
+    # Allowed status transitions; sold is terminal. Cars in the import
+    # lifecycle may move forward any number of steps or back one step.
+    STATUS_TRANSITIONS = {
+        **{
+            status: set(STATUS_PIPELINE[index + 1:]) | set(STATUS_PIPELINE[max(index - 1, 0):index])
+            for index, status in enumerate(STATUS_PIPELINE[:-1])
+        },
+        "in_transit": {"available", "in_service", "reserved"},
+        "in_service": {"available", "reserved"},
+        "available": {"reserved", "sold", "in_service", "in_transit"},
+        "reserved": {"available", "sold"},
+        "sold": set(),
+    }
+    
     def __init__(
         self,
         brand: str,
@@ -19,9 +39,11 @@ class CarModel:
         selling_price: float,
         status: str = "available",
         manager: Optional[str] = None,
+        manager_id: Optional[str] = None,
         location: Optional[str] = None,
         images: Optional[List[str]] = None,
         arrival_date: Optional[datetime] = None,
+        sold_date: Optional[datetime] = None,
         car_id: Optional[str] = None
     ):
         self.id = car_id
@@ -35,9 +57,13 @@ class CarModel:
         self.selling_price = selling_price
         self.status = status
         self.manager = manager
+        self.manager_id = manager_id
         self.location = location
         self.images = images or []
         self.arrival_date = arrival_date or datetime.now()
+        self.sold_date = sold_date
+        # Set when the car was loaded from the sold-car archive
+        self.archived = False
     
     def to_dict(self) -> dict:
         """Convert model to dictionary for Firestore."""
@@ -52,11 +78,30 @@ class CarModel:
             "sellingPrice": self.selling_price,
             "status": self.status,
             "manager": self.manager,
+            "managerId": self.manager_id,
             "location": self.location,
             "images": self.images,
             "arrivalDate": self.arrival_date,
+            "soldDate": self.format_sold_date(self.sold_date),
         }
     
+    @classmethod
+    def format_sold_date(cls, value):
+        """Convert a sold date to the string format stored in the cars collection."""
+        if isinstance(value, datetime):
+            return value.strftime(cls.SOLD_DATE_FORMAT)
+        return value
+    
+    @classmethod
+    def can_transition(cls, current: Optional[str], new: str) -> bool:
+        """Check whether a car may move from one status to another.
+        
+        Statuses missing from the transition map are not blocked.
+        """
+        if current == new or current not in cls.STATUS_TRANSITIONS:
+            return True
+        return new in cls.STATUS_TRANSITIONS[current]
+    
     @classmethod
     def from_dict(cls, data: dict, car_id: str = None):
         """Create model from Firestore dictionary."""
@@ -72,7 +117,9 @@ class CarModel:
             selling_price=data.get("sellingPrice", 0.0),
             status=data.get("status", "available"),
             manager=data.get("manager"),
+            manager_id=data.get("managerId"),
             location=data.get("location"),
             images=data.get("images", []),
             arrival_date=data.get("arrivalDate"),
+            sold_date=data.get("soldDate"),
         )
@@ -1,4 +1,15 @@
 from .staff import router as staff_router
 from .car import router as car_router
+from .replica import router as replica_router
+from .report import router as report_router
+from .metrics import router as metrics_router
+from .archive import router as archive_router
 
-__all__ = ["staff_router", "car_router"]
+__all__ = [
+    "staff_router",
+    "car_router",
+    "replica_router",
+    "report_router",
+    "metrics_router",
+    "archive_router",
+]
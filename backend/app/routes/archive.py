@@ -0,0 +1,26 @@
+"""API routes for the sold-car archive."""
+from fastapi import APIRouter, Query
+from typing import List, Optional
+from datetime import datetime
+from app.schemas.car import ArchiveRunResponse, ArchiveRollupResponse
+from app.services.archive_service import ArchiveService
+
+router = APIRouter(prefix="/api/archive", tags=["archive"])
+archive_service = ArchiveService()
+
+@router.post("/run", response_model=ArchiveRunResponse)
+async def run_archive(
+    older_than_days: Optional[int] = Query(None, ge=0, description="Archive cars sold more than N days ago"),
+):
+    """Move old sold cars from the working collection into the archive."""
+    result = await archive_service.archive_sold_cars(older_than_days)
+    return ArchiveRunResponse(**result)
+
+@router.get("/rollups", response_model=List[ArchiveRollupResponse])
+async def get_rollups(
+    sold_from: Optional[datetime] = Query(None, description="First month to include"),
+    sold_to: Optional[datetime] = Query(None, description="Last month to include"),
+):
+    """Get monthly summary rollups of archived cars."""
+    rollups = await archive_service.get_rollups(sold_from, sold_to)
+    return [ArchiveRollupResponse(**rollup) for rollup in rollups]
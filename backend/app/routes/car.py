@@ -1,8 +1,15 @@
 """API routes for car operations."""
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
-from app.schemas.car import CarCreate, CarUpdate, CarResponse
-from app.services.car_service import CarService
+from datetime import datetime
+from app.schemas.car import (
+    CarCreate,
+    CarUpdate,
+    CarResponse,
+    CarBulkUpdate,
+    CarBulkUpdateResponse,
+)
+from app.services.car_service import CarService, CarUpdateConflict
 
 router = APIRouter(prefix="/api/cars", tags=["cars"])
 car_service = CarService()
@@ -23,19 +30,34 @@ async def create_car(car_data: CarCreate):
         selling_price=car.selling_price,
         status=car.status,
         manager=car.manager,
+        manager_id=car.manager_id,
         location=car.location,
         images=car.images,
         arrival_date=car.arrival_date,
+        sold_date=car.sold_date,
+        archived=car.archived,
     )
 
 @router.get("/", response_model=List[CarResponse])
 async def get_all_cars(
     status: Optional[str] = Query(None, description="Filter by status"),
     manager: Optional[str] = Query(None, description="Filter by manager"),
+    manager_id: Optional[str] = Query(None, description="Filter by manager ID"),
     limit: Optional[int] = Query(None, description="Limit results"),
+    include_archived: bool = Query(False, description="Include archived sold cars"),
+    sold_from: Optional[datetime] = Query(None, description="Sold on or after this date (includes archive)"),
+    sold_to: Optional[datetime] = Query(None, description="Sold on or before this date (includes archive)"),
 ):
     """Get all cars with optional filtering."""
-    cars = await car_service.get_all_cars(limit=limit, status=status, manager=manager)
+    cars = await car_service.get_all_cars(
+        limit=limit,
+        status=status,
+        manager=manager,
+        manager_id=manager_id,
+        include_archived=include_archived,
+        sold_from=sold_from,
+        sold_to=sold_to,
+    )
     return [
         CarResponse(
             id=car.id,
@@ -49,9 +71,12 @@ async def get_all_cars(
             selling_price=car.selling_price,
             status=car.status,
             manager=car.manager,
+            manager_id=car.manager_id,
             location=car.location,
             images=car.images,
             arrival_date=car.arrival_date,
+            sold_date=car.sold_date,
+            archived=car.archived,
         )
         for car in cars
     ]
@@ -73,17 +98,35 @@ async def get_cars_by_manager(manager_name: str):
             selling_price=car.selling_price,
             status=car.status,
             manager=car.manager,
+            manager_id=car.manager_id,
             location=car.location,
             images=car.images,
             arrival_date=car.arrival_date,
+            sold_date=car.sold_date,
+            archived=car.archived,
         )
         for car in cars
     ]
 
+@router.patch("/bulk", response_model=CarBulkUpdateResponse)
+async def bulk_update_cars(bulk_data: CarBulkUpdate):
+    """Apply a partial update or status transition to many cars at once."""
+    results = await car_service.bulk_update_cars(bulk_data)
+    updated = sum(1 for result in results if result.success)
+    return CarBulkUpdateResponse(
+        matched=len(results),
+        updated=updated,
+        failed=len(results) - updated,
+        results=results,
+    )
+
 @router.get("/{car_id}", response_model=CarResponse)
-async def get_car(car_id: str):
+async def get_car(
+    car_id: str,
+    include_archived: bool = Query(False, description="Also look in the sold-car archive"),
+):
     """Get car by ID."""
-    car = await car_service.get_car_by_id(car_id)
+    car = await car_service.get_car_by_id(car_id, include_archived=include_archived)
     if not car:
         raise HTTPException(status_code=404, detail="Car not found")
     
@@ -99,15 +142,21 @@ async def get_car(car_id: str):
         selling_price=car.selling_price,
         status=car.status,
         manager=car.manager,
+        manager_id=car.manager_id,
         location=car.location,
         images=car.images,
         arrival_date=car.arrival_date,
+        sold_date=car.sold_date,
+        archived=car.archived,
     )
 
 @router.put("/{car_id}", response_model=CarResponse)
 async def update_car(car_id: str, car_data: CarUpdate):
     """Update car."""
-    car = await car_service.update_car(car_id, car_data)
+    try:
+        car = await car_service.update_car(car_id, car_data)
+    except CarUpdateConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
     if not car:
         raise HTTPException(status_code=404, detail="Car not found")
     
@@ -123,9 +172,12 @@ async def update_car(car_id: str, car_data: CarUpdate):
         selling_price=car.selling_price,
         status=car.status,
         manager=car.manager,
+        manager_id=car.manager_id,
         location=car.location,
         images=car.images,
         arrival_date=car.arrival_date,
+        sold_date=car.sold_date,
+        archived=car.archived,
     )
 
 @router.delete("/{car_id}", status_code=204)
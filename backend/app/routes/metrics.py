@@ -0,0 +1,16 @@
+"""API routes for operational metrics."""
+from fastapi import APIRouter
+from app.middleware.admission import admission_controller
+from app.services.firestore_calls import firestore_calls
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+
+@router.get("/admission")
+async def get_admission_metrics():
+    """Get admission queue depth, in-flight requests and shed counts."""
+    return admission_controller.get_stats()
+
+@router.get("/firestore")
+async def get_firestore_metrics():
+    """Get Firestore retry, hedge and latency counters per operation."""
+    return firestore_calls.get_stats()
@@ -0,0 +1,13 @@
+"""API routes for the local read replica."""
+from fastapi import APIRouter
+from app.services.replica_service import get_replica
+
+router = APIRouter(prefix="/api/replica", tags=["replica"])
+
+@router.get("/status")
+async def get_replica_status():
+    """Get replica freshness and resume tokens per collection."""
+    replica = get_replica()
+    if not replica:
+        return {"enabled": False}
+    return replica.get_status()
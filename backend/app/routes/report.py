@@ -0,0 +1,56 @@
+"""API routes for report generation."""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from app.schemas.report import ReportCreate, ReportJobResponse
+from app.services.report_service import ReportService, ReportJob
+from app.services.report_writers import MEDIA_TYPES
+
+router = APIRouter(prefix="/api/reports", tags=["reports"])
+report_service = ReportService()
+
+def _job_response(job: ReportJob, cached: bool = False) -> ReportJobResponse:
+    return ReportJobResponse(
+        id=job.id,
+        report_type=job.report_type,
+        format=job.format,
+        period=job.period,
+        status=job.status,
+        progress=job.progress,
+        rows_written=job.rows_written,
+        total_rows=job.total_rows,
+        cached=cached,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+    )
+
+@router.post("/", response_model=ReportJobResponse, status_code=202)
+async def submit_report(report_data: ReportCreate):
+    """Submit a report job."""
+    job, cached = report_service.submit(report_data)
+    return _job_response(job, cached)
+
+@router.get("/{job_id}", response_model=ReportJobResponse)
+async def get_report(job_id: str):
+    """Get report job status and progress."""
+    job = report_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return _job_response(job)
+
+@router.get("/{job_id}/download")
+async def download_report(job_id: str):
+    """Download a finished report."""
+    job = report_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error or "Report generation failed")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail="Report is not ready yet")
+    
+    return FileResponse(
+        job.path,
+        media_type=MEDIA_TYPES[job.format],
+        filename=job.filename,
+    )
@@ -1,7 +1,14 @@
 """API routes for staff operations."""
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
-from app.schemas.staff import StaffCreate, StaffUpdate, StaffResponse
+from app.schemas.staff import (
+    StaffCreate,
+    StaffUpdate,
+    StaffResponse,
+    ManagerCarSummary,
+    StaffWithCarsResponse,
+)
+from app.schemas.car import CarResponse
 from app.services.staff_service import StaffService
 
 router = APIRouter(prefix="/api/staff", tags=["staff"])
@@ -67,6 +74,53 @@ async def search_staff(q: str = Query(..., description="Search query")):
         for staff in staff_list
     ]
 
+@router.get("/with-cars", response_model=List[StaffWithCarsResponse])
+async def get_staff_with_cars(
+    status: Optional[str] = Query(None, description="Filter by status"),
+    limit: Optional[int] = Query(None, description="Limit results"),
+    summary_only: bool = Query(False, description="Return per-manager summaries without car lists"),
+):
+    """Get staff members with their assigned cars in one request."""
+    rows = await staff_service.get_staff_with_cars(limit=limit, status=status)
+    return [
+        StaffWithCarsResponse(
+            id=staff.id,
+            name=staff.name,
+            inn=staff.inn,
+            phone=staff.phone,
+            email=staff.email,
+            city=staff.city,
+            status=staff.status,
+            registered_date=staff.registered_date,
+            total_orders=staff.total_orders,
+            total_spent=staff.total_spent,
+            car_summary=ManagerCarSummary(**staff_service.summarize_cars(cars)),
+            cars=None if summary_only else [
+                CarResponse(
+                    id=car.id,
+                    brand=car.brand,
+                    model=car.model,
+                    year=car.year,
+                    vin=car.vin,
+                    color=car.color,
+                    mileage=car.mileage,
+                    purchase_price=car.purchase_price,
+                    selling_price=car.selling_price,
+                    status=car.status,
+                    manager=car.manager,
+                    manager_id=car.manager_id,
+                    location=car.location,
+                    images=car.images,
+                    arrival_date=car.arrival_date,
+                    sold_date=car.sold_date,
+                    archived=car.archived,
+                )
+                for car in cars
+            ],
+        )
+        for staff, cars in rows
+    ]
+
 @router.get("/{staff_id}", response_model=StaffResponse)
 async def get_staff(staff_id: str):
     """Get staff member by ID."""
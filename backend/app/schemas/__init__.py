@@ -1,11 +1,38 @@
-from .staff import StaffCreate, StaffUpdate, StaffResponse
-from .car import CarCreate, CarUpdate, CarResponse
+from .staff import (
+    StaffCreate,
+    StaffUpdate,
+    StaffResponse,
+    ManagerCarSummary,
+    StaffWithCarsResponse,
+)
+from .car import (
+    CarCreate,
+    CarUpdate,
+    CarResponse,
+    CarBulkFilter,
+    CarBulkUpdate,
+    CarBulkItemResult,
+    CarBulkUpdateResponse,
+    ArchiveRunResponse,
+    ArchiveRollupResponse,
+)
+from .report import ReportCreate, ReportJobResponse
 
 __all__ = [
     "StaffCreate",
     "StaffUpdate",
     "StaffResponse",
+    "ManagerCarSummary",
+    "StaffWithCarsResponse",
     "CarCreate",
     "CarUpdate",
     "CarResponse",
+    "CarBulkFilter",
+    "CarBulkUpdate",
+    "CarBulkItemResult",
+    "CarBulkUpdateResponse",
+    "ArchiveRunResponse",
+    "ArchiveRollupResponse",
+    "ReportCreate",
+    "ReportJobResponse",
 ]
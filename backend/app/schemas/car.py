@@ -1,8 +1,10 @@
 """Pydantic schemas for Car validation and serialization."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, List
 from datetime import datetime
 
+CAR_STATUS_PATTERN = "^(in_korea|shipping|at_port|customs|in_stock|sold|available|reserved|in_transit|in_service)$"
+
 class CarBase(BaseModel):
     """Base car schema."""
     brand: str = Field(..., min_length=1, max_length=100)
@@ -15,9 +17,10 @@ class CarBase(BaseModel):
     selling_price: float = Field(..., ge=0)
     status: Optional[str] = Field(
         default="available",
-        pattern="^(available|reserved|sold|in_transit|in_service)$"
+        pattern=CAR_STATUS_PATTERN
     )
     manager: Optional[str] = None
+    manager_id: Optional[str] = None
     location: Optional[str] = None
     images: Optional[List[str]] = []
 
@@ -37,16 +40,79 @@ class CarUpdate(BaseModel):
     selling_price: Optional[float] = Field(None, ge=0)
     status: Optional[str] = Field(
         None,
-        pattern="^(available|reserved|sold|in_transit|in_service)$"
+        pattern=CAR_STATUS_PATTERN
     )
     manager: Optional[str] = None
+    manager_id: Optional[str] = None
     location: Optional[str] = None
     images: Optional[List[str]] = None
+    sold_date: Optional[datetime] = None
 
 class CarResponse(CarBase):
     """Schema for car response."""
     id: str
     arrival_date: datetime
+    sold_date: Optional[datetime] = None
+    archived: bool = False
     
     class Config:
         from_attributes = True
+
+class CarBulkFilter(BaseModel):
+    """Schema for selecting cars by field values in a bulk update."""
+    status: Optional[str] = Field(None, pattern=CAR_STATUS_PATTERN)
+    location: Optional[str] = None
+    manager: Optional[str] = None
+
+class CarBulkUpdate(BaseModel):
+    """Schema for applying one partial update or status transition to many cars."""
+    ids: Optional[List[str]] = Field(None, min_length=1, max_length=1000)
+    filter: Optional[CarBulkFilter] = None
+    update: Optional[CarUpdate] = None
+    status: Optional[str] = Field(None, pattern=CAR_STATUS_PATTERN)
+    
+    @model_validator(mode="after")
+    def check_target_and_change(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Provide exactly one of 'ids' or 'filter'")
+        if self.filter is not None and not self.filter.model_dump(exclude_none=True):
+            raise ValueError("'filter' must set at least one field")
+        has_update = self.update is not None and any(
+            value is not None for value in self.update.model_dump(exclude_unset=True).values()
+        )
+        if self.status is None and not has_update:
+            raise ValueError("Provide a non-empty 'update', 'status' or both")
+        if self.status and self.update and self.update.status and self.update.status != self.status:
+            raise ValueError("'status' conflicts with 'update.status'")
+        return self
+
+class CarBulkItemResult(BaseModel):
+    """Schema for the outcome of one car in a bulk update."""
+    id: str
+    success: bool
+    previous_status: Optional[str] = None
+    status: Optional[str] = None
+    error: Optional[str] = None
+
+class CarBulkUpdateResponse(BaseModel):
+    """Schema for bulk update response."""
+    matched: int
+    updated: int
+    failed: int
+    results: List[CarBulkItemResult]
+
+class ArchiveRunResponse(BaseModel):
+    """Schema for the outcome of an archival run."""
+    cutoff: datetime
+    archived: int
+    skipped: int = 0
+    conflicts: int = 0
+    partitions: List[str]
+
+class ArchiveRollupResponse(BaseModel):
+    """Schema for monthly rollups of archived cars."""
+    partition: str
+    count: int = 0
+    total_purchase: float = 0.0
+    total_selling: float = 0.0
+    total_profit: float = 0.0
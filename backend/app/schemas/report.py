@@ -0,0 +1,28 @@
+"""Pydantic schemas for report job validation and serialization."""
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+class ReportCreate(BaseModel):
+    """Schema for submitting a report job."""
+    report_type: str = Field(..., pattern="^(sales|inventory|financial|staff)$")
+    format: str = Field(default="csv", pattern="^(csv|xlsx|pdf)$")
+    period: str = Field(default="month", pattern="^(week|month|quarter|year)$")
+
+class ReportJobResponse(BaseModel):
+    """Schema for report job status."""
+    id: str
+    report_type: str
+    format: str
+    period: str
+    status: str
+    progress: float = 0.0
+    rows_written: int = 0
+    total_rows: Optional[int] = None
+    cached: bool = False
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
@@ -1,7 +1,8 @@
 """Pydantic schemas for Staff validation and serialization."""
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Optional, List, Dict
 from datetime import datetime
+from app.schemas.car import CarResponse
 
 class StaffBase(BaseModel):
     """Base staff schema."""
@@ -36,3 +37,15 @@ class StaffResponse(StaffBase):
     
     class Config:
         from_attributes = True
+
+class ManagerCarSummary(BaseModel):
+    """Schema for per-manager car totals."""
+    total: int = 0
+    by_status: Dict[str, int] = {}
+    total_purchase: float = 0.0
+    total_selling: float = 0.0
+
+class StaffWithCarsResponse(StaffResponse):
+    """Schema for a staff member together with assigned cars."""
+    car_summary: ManagerCarSummary
+    cars: Optional[List[CarResponse]] = None
@@ -1,4 +1,14 @@
 from .staff_service import StaffService
 from .car_service import CarService
+from .replica_service import ReplicaService, get_replica
+from .report_service import ReportService
+from .archive_service import ArchiveService
 
-__all__ = ["StaffService", "CarService"]
+__all__ = [
+    "StaffService",
+    "CarService",
+    "ReplicaService",
+    "get_replica",
+    "ReportService",
+    "ArchiveService",
+]
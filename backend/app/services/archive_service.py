@@ -0,0 +1,259 @@
+"""Business logic for archiving sold cars out of the working collection."""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from google.api_core.exceptions import FailedPrecondition
+from google.cloud.firestore_v1 import FieldFilter, Increment
+from app.models.car import CarModel
+from app.config import get_db, settings
+from app.services.replica_service import get_replica, parse_timestamp, UPDATED_AT_FIELD
+from app.services.firestore_calls import firestore_calls
+
+# Archive layout: carsArchive/{YYYY-MM} holds the monthly rollup,
+# carsArchive/{YYYY-MM}/archivedCars/{car_id} holds the archived cars and
+# carsArchiveIndex/{car_id} records each car's partition, so lookups by ID
+# need no collection group index
+ARCHIVE_COLLECTION = "carsArchive"
+ARCHIVED_CARS_SUBCOLLECTION = "archivedCars"
+ARCHIVE_INDEX_COLLECTION = "carsArchiveIndex"
+
+# Each archived car costs three writes (copy, index entry, delete) plus at
+# most one rollup update, which keeps a chunk under 500 writes per batch
+ARCHIVE_CHUNK_SIZE = 120
+
+# Date ranges spanning more months than this use a collection group query
+MAX_PARTITION_QUERIES = 24
+
+
+def partition_for(date: datetime) -> str:
+    """Get the year/month partition key for a sold date."""
+    return f"{date.year:04d}-{date.month:02d}"
+
+
+def sold_date_of(data: dict) -> Optional[datetime]:
+    """Get a sold car's sale time, falling back to its last update time.
+
+    The frontend stores `soldDate` as a "YYYY-MM-DD" string, or not at all.
+    """
+    return parse_timestamp(data.get("soldDate")) or parse_timestamp(data.get(UPDATED_AT_FIELD))
+
+
+def as_utc(date: datetime) -> datetime:
+    """Treat naive datetimes as UTC."""
+    if date.tzinfo is None:
+        return date.replace(tzinfo=timezone.utc)
+    return date
+
+
+class ArchiveService:
+    """Service for moving sold cars into monthly archive partitions."""
+
+    def __init__(self):
+        self.db = get_db()
+        self.cars = self.db.collection(CarModel.COLLECTION_NAME)
+        self.archive = self.db.collection(ARCHIVE_COLLECTION)
+        self.archive_index = self.db.collection(ARCHIVE_INDEX_COLLECTION)
+        self.replica = get_replica()
+
+    def _partition_ref(self, partition: str):
+        return self.archive.document(partition)
+
+    def _archived_cars(self, partition: str):
+        return self._partition_ref(partition).collection(ARCHIVED_CARS_SUBCOLLECTION)
+
+    async def archive_sold_cars(self, older_than_days: Optional[int] = None) -> dict:
+        """Move cars sold more than N days ago into the archive.
+
+        Sold cars are scanned and their sale time read with `sold_date_of`,
+        since `soldDate` may be a string or missing and cannot be filtered on
+        server-side. Each chunk atomically copies cars into their partition
+        with `soldDate` stored as a timestamp, removes them from the working
+        collection and bumps the partition rollup. Each delete is conditional
+        on the scanned snapshot, so a chunk whose cars were edited or archived
+        by a concurrent run fails as a whole and is counted as conflicts.
+        Cars with no usable date are left in place and counted as skipped.
+        """
+        days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        query = self.cars.where(filter=FieldFilter("status", "==", "sold"))
+
+        archived = 0
+        skipped = 0
+        conflicts = 0
+        partitions = set()
+        chunk = []
+        async for doc in firestore_calls.aiter_query("archive.select", query):
+            data = doc.to_dict()
+            sold_date = sold_date_of(data)
+            if sold_date is None:
+                skipped += 1
+                continue
+            if sold_date >= cutoff:
+                continue
+            chunk.append((doc, data, sold_date))
+            if len(chunk) >= ARCHIVE_CHUNK_SIZE:
+                chunk_partitions = await self._archive_chunk(chunk)
+                if chunk_partitions is None:
+                    conflicts += len(chunk)
+                else:
+                    partitions |= chunk_partitions
+                    archived += len(chunk)
+                chunk = []
+        if chunk:
+            chunk_partitions = await self._archive_chunk(chunk)
+            if chunk_partitions is None:
+                conflicts += len(chunk)
+            else:
+                partitions |= chunk_partitions
+                archived += len(chunk)
+
+        return {
+            "cutoff": cutoff,
+            "archived": archived,
+            "skipped": skipped,
+            "conflicts": conflicts,
+            "partitions": sorted(partitions),
+        }
+
+    async def _archive_chunk(self, docs) -> Optional[set]:
+        """Archive a chunk of cars, returning its partitions or None if it went stale."""
+        batch = self.db.batch()
+        archived_at = datetime.now(timezone.utc)
+        rollups: Dict[str, Dict[str, float]] = {}
+
+        for doc, data, sold_date in docs:
+            partition = partition_for(sold_date)
+            batch.set(
+                self._archived_cars(partition).document(doc.id),
+                {**data, "soldDate": sold_date, "carId": doc.id, "archivedAt": archived_at},
+            )
+            batch.set(self.archive_index.document(doc.id), {"partition": partition})
+            batch.delete(doc.reference, option=self.db.write_option(last_update_time=doc.update_time))
+
+            purchase = data.get("purchasePrice", 0.0) or 0.0
+            selling = data.get("sellingPrice", 0.0) or 0.0
+            totals = rollups.setdefault(
+                partition,
+                {"count": 0, "totalPurchase": 0.0, "totalSelling": 0.0, "totalProfit": 0.0},
+            )
+            totals["count"] += 1
+            totals["totalPurchase"] += purchase
+            totals["totalSelling"] += selling
+            totals["totalProfit"] += selling - purchase
+
+        for partition, totals in rollups.items():
+            batch.set(
+                self._partition_ref(partition),
+                {
+                    **{field: Increment(value) for field, value in totals.items()},
+                    "partition": partition,
+                    "updatedAt": archived_at,
+                },
+                merge=True,
+            )
+
+        # Rollup increments are not idempotent
+        try:
+            await firestore_calls.awrite("archive.commit", batch.commit, idempotent=False)
+        except FailedPrecondition:
+            return None
+
+        if self.replica:
+            for doc, _, _ in docs:
+                self.replica.delete(CarModel.COLLECTION_NAME, doc.id)
+        return set(rollups)
+
+    async def get_archived_car(self, car_id: str) -> Optional[CarModel]:
+        """Find an archived car by its original ID."""
+        entry = await firestore_calls.aread("archive.index_get", self.archive_index.document(car_id).get)
+        if not entry.exists:
+            return None
+
+        partition = entry.to_dict()["partition"]
+        doc = await firestore_calls.aread("archive.get", self._archived_cars(partition).document(car_id).get)
+        if not doc.exists:
+            return None
+        car = CarModel.from_dict(doc.to_dict(), doc.id)
+        car.archived = True
+        return car
+
+    async def get_archived_cars(
+        self,
+        sold_from: Optional[datetime] = None,
+        sold_to: Optional[datetime] = None,
+        manager: Optional[str] = None,
+        manager_id: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[CarModel]:
+        """Get archived cars, reading only the partitions a date range covers."""
+        filters = []
+        if sold_from:
+            filters.append(FieldFilter("soldDate", ">=", as_utc(sold_from)))
+        if sold_to:
+            filters.append(FieldFilter("soldDate", "<=", as_utc(sold_to)))
+        if manager:
+            filters.append(FieldFilter("manager", "==", manager))
+        if manager_id:
+            filters.append(FieldFilter("managerId", "==", manager_id))
+
+        partitions = self._partitions_between(sold_from, sold_to)
+        if partitions is None:
+            sources = [self.db.collection_group(ARCHIVED_CARS_SUBCOLLECTION)]
+        else:
+            sources = [self._archived_cars(partition) for partition in partitions]
+
+        cars = []
+        for query in sources:
+            for field_filter in filters:
+                query = query.where(filter=field_filter)
+            if limit:
+                query = query.limit(limit - len(cars))
+            docs = await firestore_calls.aquery("archive.list", lambda **kw: list(query.stream(**kw)))
+            for doc in docs:
+                car = CarModel.from_dict(doc.to_dict(), doc.id)
+                car.archived = True
+                cars.append(car)
+            if limit and len(cars) >= limit:
+                break
+        return cars
+
+    def _partitions_between(
+        self,
+        sold_from: Optional[datetime],
+        sold_to: Optional[datetime]
+    ) -> Optional[List[str]]:
+        """List the partitions covering a closed date range, or None if unbounded."""
+        if not sold_from or not sold_to:
+            return None
+
+        year, month = sold_from.year, sold_from.month
+        partitions = []
+        while (year, month) <= (sold_to.year, sold_to.month):
+            partitions.append(f"{year:04d}-{month:02d}")
+            if len(partitions) > MAX_PARTITION_QUERIES:
+                return None
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return partitions
+
+    async def get_rollups(
+        self,
+        sold_from: Optional[datetime] = None,
+        sold_to: Optional[datetime] = None
+    ) -> List[dict]:
+        """Get monthly rollups of archived cars."""
+        query = self.archive
+        if sold_from:
+            query = query.where(filter=FieldFilter("partition", ">=", partition_for(sold_from)))
+        if sold_to:
+            query = query.where(filter=FieldFilter("partition", "<=", partition_for(sold_to)))
+
+        rollups = []
+        for doc in await firestore_calls.aquery("archive.rollups", lambda **kw: list(query.stream(**kw))):
+            data = doc.to_dict()
+            rollups.append({
+                "partition": doc.id,
+                "count": data.get("count", 0),
+                "total_purchase": data.get("totalPurchase", 0.0),
+                "total_selling": data.get("totalSelling", 0.0),
+                "total_profit": data.get("totalProfit", 0.0),
+            })
+        return sorted(rollups, key=lambda rollup: rollup["partition"])
@@ -1,9 +1,40 @@
 """Business logic for car operations."""
-from typing import List, Optional
-from google.cloud.firestore_v1 import FieldFilter
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from google.api_core.exceptions import FailedPrecondition
+from google.cloud.firestore_v1 import FieldFilter, Or, SERVER_TIMESTAMP
 from app.models.car import CarModel
-from app.schemas.car import CarCreate, CarUpdate
+from app.models.staff import StaffModel
+from app.schemas.car import CarCreate, CarUpdate, CarBulkUpdate, CarBulkItemResult
 from app.config import get_db
+from app.services.replica_service import get_replica, UPDATED_AT_FIELD
+from app.services.archive_service import ArchiveService, sold_date_of, as_utc
+from app.services.firestore_calls import firestore_calls
+
+# Snake_case schema fields stored under camelCase keys in Firestore
+FIELD_MAPPING = {
+    "purchase_price": "purchasePrice",
+    "selling_price": "sellingPrice",
+    "arrival_date": "arrivalDate",
+    "shipping_cost": "shippingCost",
+    "customs_cost": "customsCost",
+    "repair_cost": "repairCost",
+    "additional_cost": "additionalCost",
+    "sold_date": "soldDate",
+    "manager_id": "managerId",
+}
+
+# Firestore allows at most 500 writes per batch
+BATCH_SIZE = 400
+
+# Staff IDs per manager OR query, leaving one disjunction for the name
+MAX_OR_IDS = 29
+
+CONCURRENT_UPDATE_ERROR = "Car was modified by another request; reload and retry"
+
+
+class CarUpdateConflict(Exception):
+    """Raised when a car update is not allowed in the car's current state."""
 
 class CarService:
     """Service for managing cars."""
@@ -11,6 +42,8 @@ class CarService:
     def __init__(self):
         self.db = get_db()
         self.collection = self.db.collection(CarModel.COLLECTION_NAME)
+        self.replica = get_replica()
+        self.archive = ArchiveService()
     
     async def create_car(self, car_data: CarCreate) -> CarModel:
         """Create a new car."""
@@ -25,6 +58,7 @@ class CarService:
             selling_price=car_data.selling_price,
             status=car_data.status,
             manager=car_data.manager,
+            manager_id=car_data.manager_id,
             location=car_data.location,
             images=car_data.images,
             shipping_cost=car_data.shipping_cost,
@@ -35,15 +69,25 @@ class CarService:
         )
         
         doc_ref = self.collection.document()
-        doc_ref.set(car.to_dict())
+        data = {**car.to_dict(), UPDATED_AT_FIELD: SERVER_TIMESTAMP}
+        await firestore_calls.awrite("cars.create", lambda **kw: doc_ref.set(data, **kw))
         car.id = doc_ref.id
         
+        if self.replica:
+            self.replica.upsert(CarModel.COLLECTION_NAME, car.id, car.to_dict())
+        
         return car
     
-    async def get_car_by_id(self, car_id: str) -> Optional[CarModel]:
+    async def get_car_by_id(
+        self,
+        car_id: str,
+        include_archived: bool = False
+    ) -> Optional[CarModel]:
         """Get car by ID."""
-        doc = self.collection.document(car_id).get()
+        doc = await firestore_calls.aread("cars.get", self.collection.document(car_id).get, hedge=True)
         if not doc.exists:
+            if include_archived:
+                return await self.archive.get_archived_car(car_id)
             return None
         return CarModel.from_dict(doc.to_dict(), car_id)
     
@@ -51,9 +95,68 @@ class CarService:
         self,
         limit: Optional[int] = None,
         status: Optional[str] = None,
-        manager: Optional[str] = None
+        manager: Optional[str] = None,
+        manager_id: Optional[str] = None,
+        include_archived: bool = False,
+        sold_from: Optional[datetime] = None,
+        sold_to: Optional[datetime] = None
+    ) -> List[CarModel]:
+        """Get all cars with optional filtering.
+        
+        Archived cars are only read when `include_archived` is set or a sold
+        date range is given.
+        """
+        dated = bool(sold_from or sold_to)
+        if dated and status and status != "sold":
+            return []
+        cars = await self._get_working_cars(limit, status, manager, manager_id, sold_from, sold_to)
+        
+        if not (include_archived or dated) or (status and status != "sold"):
+            return cars
+        if limit and len(cars) >= limit:
+            return cars
+        
+        archived = await self.archive.get_archived_cars(
+            sold_from=sold_from,
+            sold_to=sold_to,
+            manager=manager,
+            manager_id=manager_id,
+            limit=limit - len(cars) if limit else None,
+        )
+        return cars + archived
+    
+    async def _get_working_cars(
+        self,
+        limit: Optional[int],
+        status: Optional[str],
+        manager: Optional[str],
+        manager_id: Optional[str],
+        sold_from: Optional[datetime],
+        sold_to: Optional[datetime]
     ) -> List[CarModel]:
-        """Get all cars with optional filtering."""
+        """Get cars from the working collection.
+        
+        `soldDate` may be a date string, a timestamp or missing in the working
+        collection, so a sold date range selects sold cars and is applied in
+        memory with `sold_date_of`, like archival does. The working set only
+        holds recent sales, which keeps this scan small.
+        """
+        dated = bool(sold_from or sold_to)
+        if dated:
+            status = "sold"
+            query_limit = None
+        else:
+            query_limit = limit
+        
+        if self.replica and self.replica.is_fresh(CarModel.COLLECTION_NAME):
+            filters = {"status": status, "manager": manager, "managerId": manager_id}
+            docs = self.replica.query(
+                CarModel.COLLECTION_NAME,
+                {k: v for k, v in filters.items() if v},
+                query_limit,
+            )
+            return self._to_cars(docs, sold_from, sold_to, limit)
+        
         query = self.collection
         
         if status:
@@ -62,11 +165,37 @@ class CarService:
         if manager:
             query = query.where(filter=FieldFilter("manager", "==", manager))
         
-        if limit:
-            query = query.limit(limit)
+        if manager_id:
+            query = query.where(filter=FieldFilter("managerId", "==", manager_id))
         
-        docs = query.stream()
-        return [CarModel.from_dict(doc.to_dict(), doc.id) for doc in docs]
+        if query_limit:
+            query = query.limit(query_limit)
+        
+        docs = await firestore_calls.aquery("cars.list", lambda **kw: list(query.stream(**kw)))
+        return self._to_cars(((doc.id, doc.to_dict()) for doc in docs), sold_from, sold_to, limit)
+    
+    @staticmethod
+    def _to_cars(
+        docs,
+        sold_from: Optional[datetime],
+        sold_to: Optional[datetime],
+        limit: Optional[int]
+    ) -> List[CarModel]:
+        """Build car models, keeping only cars sold within the range if one is given."""
+        cars = []
+        for doc_id, data in docs:
+            if sold_from or sold_to:
+                sold_date = sold_date_of(data)
+                if sold_date is None:
+                    continue
+                if sold_from and sold_date < as_utc(sold_from):
+                    continue
+                if sold_to and sold_date > as_utc(sold_to):
+                    continue
+            cars.append(CarModel.from_dict(data, doc_id))
+            if limit and len(cars) >= limit:
+                break
+        return cars
     
     async def update_car(
         self,
@@ -75,51 +204,250 @@ class CarService:
     ) -> Optional[CarModel]:
         """Update car."""
         doc_ref = self.collection.document(car_id)
-        doc = doc_ref.get()
+        doc = await firestore_calls.aread("cars.get", doc_ref.get)
         
         if not doc.exists:
             return None
         
+        firestore_data = self._to_firestore_data(car_data)
+        current = doc.to_dict()
+        current_status = current.get("status", "available")
+        new_status = firestore_data.get("status")
+        
+        if new_status and not CarModel.can_transition(current_status, new_status):
+            raise CarUpdateConflict(f"Transition from '{current_status}' to '{new_status}' is not allowed")
+        
+        if new_status == "sold" and not current.get("soldDate"):
+            firestore_data.setdefault("soldDate", CarModel.format_sold_date(datetime.now(timezone.utc)))
+        
+        if firestore_data:
+            firestore_data[UPDATED_AT_FIELD] = SERVER_TIMESTAMP
+            # Only apply the change to the snapshot the transition was checked against
+            option = self.db.write_option(last_update_time=doc.update_time)
+            try:
+                await firestore_calls.awrite(
+                    "cars.update",
+                    lambda **kw: doc_ref.update(firestore_data, option=option, **kw),
+                )
+            except FailedPrecondition:
+                if await self._patch_applied(doc_ref, firestore_data) is None:
+                    raise CarUpdateConflict(CONCURRENT_UPDATE_ERROR)
+        
+        updated_doc = await firestore_calls.aread("cars.get", doc_ref.get)
+        if self.replica:
+            self.replica.upsert(CarModel.COLLECTION_NAME, car_id, updated_doc.to_dict())
+        return CarModel.from_dict(updated_doc.to_dict(), car_id)
+    
+    def _to_firestore_data(self, car_data: CarUpdate) -> dict:
+        """Convert provided update fields to Firestore keys."""
         # Update only provided fields
         update_data = {
             k: v for k, v in car_data.model_dump(exclude_unset=True).items()
             if v is not None
         }
         
+        if "sold_date" in update_data:
+            update_data["sold_date"] = CarModel.format_sold_date(update_data["sold_date"])
+        
         # Convert snake_case to camelCase for Firestore
-        firestore_data = {}
-        field_mapping = {
-            "purchase_price": "purchasePrice",
-            "selling_price": "sellingPrice",
-            "arrival_date": "arrivalDate",
-            "shipping_cost": "shippingCost",
-            "customs_cost": "customsCost",
-            "repair_cost": "repairCost",
-            "additional_cost": "additionalCost",
-            "sold_date": "soldDate",
+        return {
+            FIELD_MAPPING.get(key, key): value
+            for key, value in update_data.items()
         }
+    
+    async def bulk_update_cars(
+        self,
+        bulk_data: CarBulkUpdate
+    ) -> List[CarBulkItemResult]:
+        """Apply one partial update or status transition to many cars.
         
-        for key, value in update_data.items():
-            firestore_key = field_mapping.get(key, key)
-            firestore_data[firestore_key] = value
+        Cars are read with batched lookups or a single filtered query, checked
+        against the allowed status transitions and written in chunked batches.
+        Each write is conditional on the snapshot that was checked, so cars
+        changed in between are reported as failed instead of overwritten.
+        """
+        patch = self._to_firestore_data(bulk_data.update) if bulk_data.update else {}
+        if bulk_data.status:
+            patch["status"] = bulk_data.status
+        new_status = patch.get("status")
         
-        if firestore_data:
-            doc_ref.update(firestore_data)
+        results = []
+        pending: List[Tuple[object, object, dict, dict, CarBulkItemResult]] = []
         
-        updated_doc = doc_ref.get()
-        return CarModel.from_dict(updated_doc.to_dict(), car_id)
+        async for car_id, doc in self._load_bulk_targets(bulk_data):
+            if doc is None or not doc.exists:
+                results.append(CarBulkItemResult(id=car_id, success=False, error="Car not found"))
+                continue
+            
+            data = doc.to_dict()
+            current_status = data.get("status", "available")
+            result = CarBulkItemResult(
+                id=car_id,
+                success=False,
+                previous_status=current_status,
+                status=current_status,
+            )
+            results.append(result)
+            
+            if new_status and not CarModel.can_transition(current_status, new_status):
+                result.error = f"Transition from '{current_status}' to '{new_status}' is not allowed"
+                continue
+            
+            item_patch = patch
+            if new_status == "sold" and "soldDate" not in patch and not data.get("soldDate"):
+                item_patch = {**patch, "soldDate": CarModel.format_sold_date(datetime.now(timezone.utc))}
+            
+            option = self.db.write_option(last_update_time=doc.update_time)
+            pending.append((doc.reference, option, data, item_patch, result))
+        
+        for start in range(0, len(pending), BATCH_SIZE):
+            chunk = pending[start:start + BATCH_SIZE]
+            batch = self.db.batch()
+            for doc_ref, option, _, item_patch, _ in chunk:
+                batch.update(doc_ref, {**item_patch, UPDATED_AT_FIELD: SERVER_TIMESTAMP}, option=option)
+            
+            try:
+                await firestore_calls.awrite("cars.bulk_commit", batch.commit)
+            except FailedPrecondition:
+                # A batch is all-or-nothing; retry the chunk car by car so
+                # only the cars that changed since they were read fail
+                for item in chunk:
+                    await self._update_bulk_item(item, new_status)
+                continue
+            except Exception as exc:
+                for *_, result in chunk:
+                    result.error = f"Batch write failed: {exc}"
+                continue
+            
+            for doc_ref, _, data, item_patch, result in chunk:
+                self._mark_bulk_item_updated(doc_ref, data, item_patch, result, new_status)
+        
+        return results
+    
+    async def _update_bulk_item(self, item: tuple, new_status: Optional[str]):
+        doc_ref, option, data, item_patch, result = item
+        try:
+            await firestore_calls.awrite(
+                "cars.bulk_update",
+                lambda **kw: doc_ref.update(
+                    {**item_patch, UPDATED_AT_FIELD: SERVER_TIMESTAMP}, option=option, **kw
+                ),
+            )
+        except FailedPrecondition:
+            current = await self._patch_applied(doc_ref, item_patch)
+            if current is None:
+                result.error = CONCURRENT_UPDATE_ERROR
+            else:
+                self._mark_bulk_item_updated(doc_ref, current, {}, result, new_status)
+        except Exception as exc:
+            result.error = f"Write failed: {exc}"
+        else:
+            self._mark_bulk_item_updated(doc_ref, data, item_patch, result, new_status)
+    
+    async def _patch_applied(self, doc_ref, patch: dict) -> Optional[dict]:
+        """Re-read a car after a failed precondition and return it if it already has the patch.
+        
+        A write that was applied but timed out is retried, and the retry then
+        fails the precondition against our own write.
+        """
+        doc = await firestore_calls.aread("cars.get", doc_ref.get)
+        if not doc.exists:
+            return None
+        current = doc.to_dict()
+        for field, value in patch.items():
+            if value is not SERVER_TIMESTAMP and current.get(field) != value:
+                return None
+        return current
+    
+    def _mark_bulk_item_updated(
+        self,
+        doc_ref,
+        data: dict,
+        item_patch: dict,
+        result: CarBulkItemResult,
+        new_status: Optional[str]
+    ):
+        result.success = True
+        result.status = new_status or result.previous_status
+        if self.replica:
+            self.replica.upsert(CarModel.COLLECTION_NAME, doc_ref.id, {**data, **item_patch})
+    
+    async def _load_bulk_targets(self, bulk_data: CarBulkUpdate):
+        """Yield (car_id, snapshot) pairs selected by IDs or by filter."""
+        if bulk_data.ids is not None:
+            car_ids = list(dict.fromkeys(bulk_data.ids))
+            for start in range(0, len(car_ids), BATCH_SIZE):
+                chunk = car_ids[start:start + BATCH_SIZE]
+                refs = [self.collection.document(car_id) for car_id in chunk]
+                docs = {
+                    doc.id: doc
+                    for doc in await firestore_calls.aread("cars.get_all", lambda **kw: list(self.db.get_all(refs, **kw)))
+                }
+                for car_id in chunk:
+                    yield car_id, docs.get(car_id)
+            return
+        
+        query = self.collection
+        for field, value in bulk_data.filter.model_dump(exclude_none=True).items():
+            query = query.where(filter=FieldFilter(field, "==", value))
+        async for doc in firestore_calls.aiter_query("cars.bulk_select", query):
+            yield doc.id, doc
     
     async def delete_car(self, car_id: str) -> bool:
         """Delete car."""
         doc_ref = self.collection.document(car_id)
-        doc = doc_ref.get()
+        doc = await firestore_calls.aread("cars.get", doc_ref.get)
         
         if not doc.exists:
             return False
         
-        doc_ref.delete()
+        await firestore_calls.awrite("cars.delete", doc_ref.delete)
+        if self.replica:
+            self.replica.delete(CarModel.COLLECTION_NAME, car_id)
         return True
     
     async def get_cars_by_manager(self, manager_name: str) -> List[CarModel]:
-        """Get all cars managed by a specific staff member."""
-        return await self.get_all_cars(manager=manager_name)
+        """Get all cars managed by a specific staff member.
+        
+        Cars are matched by the `manager` name or by the `managerId` of any
+        staff member with that name: one staff lookup and one `OR` query, or
+        local reads only while the replica is fresh.
+        """
+        replica_fresh = self.replica and self.replica.is_fresh(CarModel.COLLECTION_NAME)
+        
+        if replica_fresh and self.replica.is_fresh(StaffModel.COLLECTION_NAME):
+            staff_ids = [
+                doc_id for doc_id, _ in
+                self.replica.query(StaffModel.COLLECTION_NAME, {"name": manager_name})
+            ]
+        else:
+            staff_query = (
+                self.db.collection(StaffModel.COLLECTION_NAME)
+                .where(filter=FieldFilter("name", "==", manager_name))
+                .select([])
+            )
+            staff_ids = await firestore_calls.aquery(
+                "cars.manager_staff", lambda **kw: [doc.id for doc in staff_query.stream(**kw)]
+            )
+        
+        if replica_fresh:
+            docs = self.replica.query(CarModel.COLLECTION_NAME, {"manager": manager_name})
+            for staff_id in staff_ids:
+                docs += self.replica.query(CarModel.COLLECTION_NAME, {"managerId": staff_id})
+        else:
+            docs = []
+            # An OR query allows at most 30 disjunctions, one of them the name
+            for start in range(0, max(len(staff_ids), 1), MAX_OR_IDS):
+                chunk = staff_ids[start:start + MAX_OR_IDS]
+                car_filter = FieldFilter("manager", "==", manager_name)
+                if chunk:
+                    car_filter = Or(filters=[car_filter, FieldFilter("managerId", "in", chunk)])
+                query = self.collection.where(filter=car_filter)
+                docs += await firestore_calls.aquery(
+                    "cars.by_manager", lambda **kw: [(doc.id, doc.to_dict()) for doc in query.stream(**kw)]
+                )
+        
+        found = {}
+        for doc_id, data in docs:
+            found.setdefault(doc_id, CarModel.from_dict(data, doc_id))
+        return list(found.values())
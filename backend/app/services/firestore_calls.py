@@ -0,0 +1,329 @@
+"""Deadlines, jittered retries and hedged reads for Firestore calls."""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, Iterator, Optional, Tuple, Type
+from google.api_core import exceptions
+from app.config import settings
+
+# Errors worth retrying for idempotent calls
+RETRYABLE_ERRORS: Tuple[Type[Exception], ...] = (
+    exceptions.ServiceUnavailable,
+    exceptions.DeadlineExceeded,
+    exceptions.InternalServerError,
+    exceptions.TooManyRequests,
+    exceptions.Aborted,
+)
+
+# Errors where the request was rejected before being applied, so even
+# non-idempotent calls (e.g. increments) can be retried safely
+REJECTED_ERRORS: Tuple[Type[Exception], ...] = (
+    exceptions.TooManyRequests,
+)
+
+# Minimum latency samples before the hedge delay follows the observed percentile
+MIN_HEDGE_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+# Page size for long scans streamed through iter_query/aiter_query
+PAGE_SIZE = 500
+
+
+class OperationStats:
+    """Counters and a rolling latency window for one named operation."""
+
+    def __init__(self):
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "failures": self.failures,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p50_ms": _ms(self.percentile(50)),
+            "p95_ms": _ms(self.percentile(95)),
+            "p99_ms": _ms(self.percentile(99)),
+        }
+
+
+def _discard_result(future):
+    if not future.cancelled():
+        future.exception()
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+class FirestoreCaller:
+    """Run Firestore calls under a deadline with retry and hedging policies.
+
+    Wrapped callables receive `retry=None` (the client library's own retries
+    are replaced by this policy) and `timeout` set to the remaining deadline.
+    """
+
+    def __init__(
+        self,
+        read_deadline: float,
+        query_deadline: float,
+        write_deadline: float,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        hedge_enabled: bool = True,
+        hedge_percentile: float = 95,
+        hedge_default_delay: float = 0.1,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.read_deadline = read_deadline
+        self.query_deadline = query_deadline
+        self.write_deadline = write_deadline
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_default_delay = hedge_default_delay
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._stats: Dict[str, OperationStats] = {}
+
+    @classmethod
+    def from_settings(cls) -> "FirestoreCaller":
+        return cls(
+            read_deadline=settings.FIRESTORE_READ_DEADLINE,
+            query_deadline=settings.FIRESTORE_QUERY_DEADLINE,
+            write_deadline=settings.FIRESTORE_WRITE_DEADLINE,
+            max_attempts=settings.FIRESTORE_MAX_ATTEMPTS,
+            backoff_base=settings.FIRESTORE_BACKOFF_BASE,
+            backoff_max=settings.FIRESTORE_BACKOFF_MAX,
+            hedge_enabled=settings.FIRESTORE_HEDGE_ENABLED,
+            hedge_percentile=settings.FIRESTORE_HEDGE_PERCENTILE,
+            hedge_default_delay=settings.FIRESTORE_HEDGE_DEFAULT_DELAY,
+        )
+
+    # ------------------------------------------------------------------
+    # Blocking API, for background threads (replica sync, report jobs)
+    # ------------------------------------------------------------------
+
+    def read(self, operation: str, fn: Callable):
+        """Run an idempotent point read."""
+        return self.call(operation, fn, self.read_deadline, idempotent=True)
+
+    def query(self, operation: str, fn: Callable):
+        """Run an idempotent query."""
+        return self.call(operation, fn, self.query_deadline, idempotent=True)
+
+    def write(self, operation: str, fn: Callable, idempotent: bool = True):
+        """Run a write. Non-idempotent writes are only retried when rejected."""
+        return self.call(operation, fn, self.write_deadline, idempotent=idempotent)
+
+    def call(
+        self,
+        operation: str,
+        fn: Callable,
+        deadline: float,
+        idempotent: bool = True
+    ):
+        """Run a call until it succeeds, fails permanently or the deadline passes."""
+        stats = self._get_stats(operation)
+        with self._lock:
+            stats.calls += 1
+
+        retryable = RETRYABLE_ERRORS if idempotent else REJECTED_ERRORS
+        expires_at = time.monotonic() + deadline
+        attempt = 0
+
+        while True:
+            attempt += 1
+            try:
+                return self._attempt(stats, fn, expires_at - time.monotonic())
+            except retryable:
+                backoff = self._next_backoff(stats, attempt, expires_at)
+                if backoff is None:
+                    raise
+                self._sleep(backoff)
+            except Exception:
+                self._count_failure(stats)
+                raise
+
+    def iter_query(self, operation: str, query, page_size: int = PAGE_SIZE) -> Iterator:
+        """Stream a query page by page, retrying each page under the query deadline."""
+        cursor = None
+        while True:
+            page_query = query.limit(page_size)
+            if cursor is not None:
+                page_query = page_query.start_after(cursor)
+            docs = self.query(operation, lambda **kw: list(page_query.stream(**kw)))
+            yield from docs
+            if len(docs) < page_size:
+                return
+            cursor = docs[-1]
+
+    # ------------------------------------------------------------------
+    # Async API, for request handlers. Attempts run in worker threads and
+    # backoff uses asyncio.sleep so the event loop is never blocked.
+    # ------------------------------------------------------------------
+
+    async def aread(self, operation: str, fn: Callable, hedge: bool = False):
+        """Run an idempotent point read, optionally hedged."""
+        return await self.acall(operation, fn, self.read_deadline, idempotent=True, hedge=hedge)
+
+    async def aquery(self, operation: str, fn: Callable):
+        """Run an idempotent query."""
+        return await self.acall(operation, fn, self.query_deadline, idempotent=True)
+
+    async def awrite(self, operation: str, fn: Callable, idempotent: bool = True):
+        """Run a write. Non-idempotent writes are only retried when rejected."""
+        return await self.acall(operation, fn, self.write_deadline, idempotent=idempotent)
+
+    async def acall(
+        self,
+        operation: str,
+        fn: Callable,
+        deadline: float,
+        idempotent: bool = True,
+        hedge: bool = False
+    ):
+        """Async counterpart of `call`, with optional hedging."""
+        stats = self._get_stats(operation)
+        with self._lock:
+            stats.calls += 1
+
+        retryable = RETRYABLE_ERRORS if idempotent else REJECTED_ERRORS
+        expires_at = time.monotonic() + deadline
+        attempt = 0
+
+        while True:
+            attempt += 1
+            try:
+                if hedge and self.hedge_enabled:
+                    return await self._hedged_attempt(stats, fn, expires_at)
+                return await asyncio.to_thread(
+                    self._attempt, stats, fn, expires_at - time.monotonic()
+                )
+            except retryable:
+                backoff = self._next_backoff(stats, attempt, expires_at)
+                if backoff is None:
+                    raise
+                await asyncio.sleep(backoff)
+            except Exception:
+                self._count_failure(stats)
+                raise
+
+    async def aiter_query(self, operation: str, query, page_size: int = PAGE_SIZE) -> AsyncIterator:
+        """Async counterpart of `iter_query`."""
+        cursor = None
+        while True:
+            page_query = query.limit(page_size)
+            if cursor is not None:
+                page_query = page_query.start_after(cursor)
+            docs = await self.aquery(operation, lambda **kw: list(page_query.stream(**kw)))
+            for doc in docs:
+                yield doc
+            if len(docs) < page_size:
+                return
+            cursor = docs[-1]
+
+    # ------------------------------------------------------------------
+    # Shared helpers
+    # ------------------------------------------------------------------
+
+    def _next_backoff(self, stats: OperationStats, attempt: int, expires_at: float) -> Optional[float]:
+        """Count a retry and pick its jittered delay, or None when out of attempts or time."""
+        remaining = expires_at - time.monotonic()
+        if attempt >= self.max_attempts or remaining <= 0:
+            self._count_failure(stats)
+            return None
+        backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        with self._lock:
+            stats.retries += 1
+        return min(backoff, remaining)
+
+    def _count_failure(self, stats: OperationStats):
+        with self._lock:
+            stats.failures += 1
+
+    def _attempt(self, stats: OperationStats, fn: Callable, timeout: float):
+        with self._lock:
+            stats.attempts += 1
+        started = time.monotonic()
+        result = fn(retry=None, timeout=max(timeout, 0.001))
+        with self._lock:
+            stats.latencies.append(time.monotonic() - started)
+        return result
+
+    def _hedge_delay(self, stats: OperationStats) -> float:
+        with self._lock:
+            if len(stats.latencies) < MIN_HEDGE_SAMPLES:
+                return self.hedge_default_delay
+            return stats.percentile(self.hedge_percentile)
+
+    async def _hedged_attempt(self, stats: OperationStats, fn: Callable, expires_at: float):
+        """Send a second request if the first is slower than the observed percentile."""
+        timeout = expires_at - time.monotonic()
+        primary = asyncio.ensure_future(asyncio.to_thread(self._attempt, stats, fn, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=min(self._hedge_delay(stats), max(timeout, 0)))
+        if done:
+            return primary.result()
+
+        with self._lock:
+            stats.hedges += 1
+        secondary = asyncio.ensure_future(
+            asyncio.to_thread(self._attempt, stats, fn, expires_at - time.monotonic())
+        )
+        pending = {primary, secondary}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is secondary:
+                        with self._lock:
+                            stats.hedge_wins += 1
+                    for loser in pending:
+                        # The losing thread cannot be interrupted; just ignore its outcome
+                        loser.add_done_callback(_discard_result)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _get_stats(self, operation: str) -> OperationStats:
+        with self._lock:
+            stats = self._stats.get(operation)
+            if stats is None:
+                stats = self._stats[operation] = OperationStats()
+            return stats
+
+    def get_stats(self) -> dict:
+        """Describe retry, hedge and latency counters per operation."""
+        with self._lock:
+            operations = {name: stats.to_dict() for name, stats in self._stats.items()}
+        return {
+            "retries": sum(op["retries"] for op in operations.values()),
+            "hedges": sum(op["hedges"] for op in operations.values()),
+            "hedge_wins": sum(op["hedge_wins"] for op in operations.values()),
+            "failures": sum(op["failures"] for op in operations.values()),
+            "operations": operations,
+        }
+
+
+firestore_calls = FirestoreCaller.from_settings()
@@ -0,0 +1,426 @@
+"""Local SQLite read replica of Firestore collections."""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from google.cloud.firestore_v1 import FieldFilter
+from app.models.car import CarModel
+from app.models.staff import StaffModel
+from app.config import get_db, settings
+from app.services.firestore_calls import firestore_calls
+
+logger = logging.getLogger(__name__)
+
+# Field stamped with a server timestamp on every backend write and with an
+# ISO 8601 string by the frontend. The resume token is the newest value of
+# this field seen by the replica.
+UPDATED_AT_FIELD = "updatedAt"
+
+# Firestore accepts at most this many references in one get_all call
+GET_ALL_CHUNK_SIZE = 300
+
+
+def _encode(value):
+    """JSON fallback encoder for Firestore values."""
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    return str(value)
+
+
+def _decode(obj: dict):
+    """JSON object hook restoring encoded Firestore values."""
+    if "__datetime__" in obj and len(obj) == 1:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Read a time stored either as a Firestore timestamp or an ISO string."""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return None
+
+
+def _iso_token(token: datetime) -> str:
+    """Format a token the way the frontend writes `updatedAt` (`toISOString`)."""
+    token = token.astimezone(timezone.utc)
+    return token.strftime("%Y-%m-%dT%H:%M:%S.") + f"{token.microsecond // 1000:03d}Z"
+
+
+def _dumps(data: dict) -> str:
+    return json.dumps(data, default=_encode, ensure_ascii=False)
+
+
+def _loads(raw: str) -> dict:
+    return json.loads(raw, object_hook=_decode)
+
+
+class ReplicaService:
+    """Disk-backed replica of the `cars` and `staff` collections.
+
+    The replica is seeded from disk at startup and caught up from Firestore in
+    the background using the resume token. It is then kept current either by
+    a snapshot listener or by re-running the catch-up every sync interval, and
+    by write hooks called from the services. Reads are only served while the
+    replica is within the configured staleness bound.
+
+    Firestore always delivers the full collection in a listener's first
+    snapshot, so listen mode still pays one full read per restart; the
+    token-based catch-up only makes the replica usable before that arrives.
+
+    Polling mode relies on `updatedAt`, which the frontend sets from the
+    browser clock. Each delta re-reads `clock_skew` seconds before the token
+    and the token never moves past the local clock, so edits from clients
+    whose clocks run slow by more than `clock_skew` are missed until the
+    listener's next full snapshot or a resync from an empty replica. Deletes
+    are found by a keys-only ID diff, which Firestore bills per document, so
+    it only runs every `reconcile_interval` seconds.
+    """
+
+    COLLECTIONS = (CarModel.COLLECTION_NAME, StaffModel.COLLECTION_NAME)
+
+    def __init__(
+        self,
+        path: str,
+        max_staleness: float,
+        listen: bool = True,
+        sync_interval: float = 60,
+        reconcile_interval: float = 3600,
+        clock_skew: float = 300
+    ):
+        self.path = path
+        self.max_staleness = max_staleness
+        self.listen = listen
+        self.sync_interval = sync_interval
+        self.reconcile_interval = reconcile_interval
+        self.clock_skew = clock_skew
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                collection TEXT NOT NULL,
+                id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (collection, id)
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sync_state (
+                collection TEXT PRIMARY KEY,
+                resume_token TEXT,
+                synced_at REAL
+            )
+            """
+        )
+        self._conn.commit()
+        self._live = set()
+        self._watches = {}
+        self._reconciled_at: Dict[str, float] = {}
+        self._stopped = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Synchronization
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Keep the replica in sync from a background thread."""
+        self._stopped.clear()
+        thread = threading.Thread(target=self._run, name="replica-sync", daemon=True)
+        thread.start()
+        return thread
+
+    def _run(self):
+        while not self._stopped.is_set():
+            for collection_name in self.COLLECTIONS:
+                if self.listen and self._is_watching(collection_name):
+                    continue
+                try:
+                    self.sync(collection_name)
+                    if self.listen:
+                        self.watch(collection_name)
+                except Exception:
+                    logger.exception("Replica sync failed for %s", collection_name)
+            self._stopped.wait(self.sync_interval)
+
+    def sync(self, collection_name: str) -> int:
+        """Fetch changes since the resume token, or everything if there is none.
+
+        Changes are found by `updatedAt`, stored as a timestamp by the backend
+        and as an ISO string by the frontend. In polling mode a document ID
+        diff, run every `reconcile_interval`, removes deleted documents and
+        fetches documents that carry no `updatedAt`; in listen mode the
+        listener's first snapshot does that instead.
+        """
+        token = self.get_resume_token(collection_name)
+        started_at = time.time()
+        collection = get_db().collection(collection_name)
+
+        if token is None:
+            docs = firestore_calls.query(
+                "replica.full_sync",
+                lambda **kw: [(doc.id, doc.to_dict()) for doc in collection.stream(**kw)],
+            )
+            self._replace_collection(collection_name, docs)
+        else:
+            docs = []
+            since = token - timedelta(seconds=self.clock_skew)
+            for value in (since, _iso_token(since)):
+                query = collection.where(filter=FieldFilter(UPDATED_AT_FIELD, ">", value))
+                docs += firestore_calls.query(
+                    "replica.delta",
+                    lambda **kw: [(doc.id, doc.to_dict()) for doc in query.stream(**kw)],
+                )
+            for doc_id, data in docs:
+                self.upsert(collection_name, doc_id, data)
+            if not self.listen and self._reconcile_due(collection_name, started_at):
+                docs += self._reconcile_ids(collection_name, collection, {doc_id for doc_id, _ in docs})
+                self._reconciled_at[collection_name] = started_at
+
+        started = datetime.fromtimestamp(started_at, timezone.utc)
+        newest = max(
+            (parsed for parsed in (parse_timestamp(data.get(UPDATED_AT_FIELD)) for _, data in docs) if parsed),
+            default=token or started,
+        )
+        if token:
+            newest = max(newest, token)
+        # A client clock running fast must not push the token into the future
+        newest = min(newest, started)
+        self._set_sync_state(collection_name, newest, started_at)
+        return len(docs)
+
+    def _reconcile_due(self, collection_name: str, now: float) -> bool:
+        last = self._reconciled_at.get(collection_name)
+        return last is None or now - last >= self.reconcile_interval
+
+    def _reconcile_ids(self, collection_name: str, collection, changed_ids: set) -> List[Tuple[str, dict]]:
+        """Drop deleted documents and fetch documents the delta query cannot see."""
+        # Read local IDs first so documents added by write hooks meanwhile are kept
+        with self._lock:
+            local_ids = {row[0] for row in self._conn.execute(
+                "SELECT id FROM documents WHERE collection = ?", (collection_name,)
+            )}
+        remote_ids = set(firestore_calls.query(
+            "replica.list_ids",
+            lambda **kw: [doc.id for doc in collection.select([]).stream(**kw)],
+        ))
+
+        for doc_id in local_ids - remote_ids:
+            self.delete(collection_name, doc_id)
+
+        missing = sorted(remote_ids - local_ids - changed_ids)
+        fetched = []
+        for start in range(0, len(missing), GET_ALL_CHUNK_SIZE):
+            refs = [collection.document(doc_id) for doc_id in missing[start:start + GET_ALL_CHUNK_SIZE]]
+            snapshots = firestore_calls.read(
+                "replica.get_all",
+                lambda **kw: list(get_db().get_all(refs, **kw)),
+            )
+            for doc in snapshots:
+                if doc.exists:
+                    self.upsert(collection_name, doc.id, doc.to_dict())
+                    fetched.append((doc.id, doc.to_dict()))
+        return fetched
+
+    def watch(self, collection_name: str):
+        """Attach a snapshot listener that keeps the collection current.
+
+        The first snapshot carries the full collection and reconciles anything
+        missed while the process was down, including deletes.
+        """
+        def on_snapshot(col_snapshot, changes, read_time):
+            if collection_name not in self._live:
+                docs = [(doc.id, doc.to_dict()) for doc in col_snapshot]
+                self._replace_collection(collection_name, docs)
+                self._live.add(collection_name)
+            else:
+                for change in changes:
+                    if change.type.name == "REMOVED":
+                        self.delete(collection_name, change.document.id)
+                    else:
+                        self.upsert(collection_name, change.document.id, change.document.to_dict())
+            self._set_sync_state(collection_name, read_time, time.time())
+
+        self._unwatch(collection_name)
+        watch = get_db().collection(collection_name).on_snapshot(on_snapshot)
+        self._watches[collection_name] = watch
+        return watch
+
+    def _is_watching(self, collection_name: str) -> bool:
+        """Check that the collection's listener is still running.
+
+        A listener that died stops counting as live, so reads fall back to
+        the staleness bound and the sync loop re-attaches it.
+        """
+        watch = self._watches.get(collection_name)
+        if watch is not None and getattr(watch, "is_active", True):
+            return True
+        if watch is not None:
+            logger.warning("Replica listener for %s stopped", collection_name)
+            self._unwatch(collection_name)
+        self._live.discard(collection_name)
+        return False
+
+    def _unwatch(self, collection_name: str):
+        watch = self._watches.pop(collection_name, None)
+        self._live.discard(collection_name)
+        if watch is not None:
+            try:
+                watch.unsubscribe()
+            except Exception:
+                logger.exception("Failed to close replica listener for %s", collection_name)
+
+    def stop(self):
+        """Stop the sync loop and detach snapshot listeners."""
+        self._stopped.set()
+        for collection_name in list(self._watches):
+            self._unwatch(collection_name)
+
+    # ------------------------------------------------------------------
+    # Write hooks
+    # ------------------------------------------------------------------
+
+    def upsert(self, collection_name: str, doc_id: str, data: dict):
+        """Insert or replace a replicated document."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                (collection_name, doc_id, _dumps(data)),
+            )
+            self._conn.commit()
+
+    def delete(self, collection_name: str, doc_id: str):
+        """Remove a replicated document."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM documents WHERE collection = ? AND id = ?",
+                (collection_name, doc_id),
+            )
+            self._conn.commit()
+
+    def _replace_collection(self, collection_name: str, docs: List[Tuple[str, dict]]):
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE collection = ?", (collection_name,))
+            self._conn.executemany(
+                "INSERT INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                [(collection_name, doc_id, _dumps(data)) for doc_id, data in docs],
+            )
+            self._conn.commit()
+
+    def _set_sync_state(self, collection_name: str, token: datetime, synced_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (collection, resume_token, synced_at) "
+                "VALUES (?, ?, ?)",
+                (collection_name, token.isoformat(), synced_at),
+            )
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get_resume_token(self, collection_name: str) -> Optional[datetime]:
+        """Get the newest update time already applied to the replica."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT resume_token FROM sync_state WHERE collection = ?",
+                (collection_name,),
+            ).fetchone()
+        if not row or not row[0]:
+            return None
+        token = datetime.fromisoformat(row[0])
+        return token if token.tzinfo else token.replace(tzinfo=timezone.utc)
+
+    def staleness(self, collection_name: str) -> Optional[float]:
+        """Seconds since the collection was last known to be current."""
+        if collection_name in self._live and self._is_watching(collection_name):
+            return 0.0
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at FROM sync_state WHERE collection = ?",
+                (collection_name,),
+            ).fetchone()
+        if not row or row[0] is None:
+            return None
+        return max(0.0, time.time() - row[0])
+
+    def is_fresh(self, collection_name: str) -> bool:
+        """Check whether reads may be served from the replica."""
+        staleness = self.staleness(collection_name)
+        return staleness is not None and staleness <= self.max_staleness
+
+    def query(
+        self,
+        collection_name: str,
+        filters: Optional[Dict[str, object]] = None,
+        limit: Optional[int] = None
+    ) -> List[Tuple[str, dict]]:
+        """Query replicated documents with equality filters."""
+        sql = "SELECT id, data FROM documents WHERE collection = ?"
+        params = [collection_name]
+
+        for field, value in (filters or {}).items():
+            sql += " AND json_extract(data, ?) = ?"
+            params.extend([f'$."{field}"', value])
+
+        sql += " ORDER BY id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(doc_id, _loads(raw)) for doc_id, raw in rows]
+
+    def get_status(self) -> dict:
+        """Describe replica freshness per collection."""
+        collections = {}
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT collection, COUNT(*) FROM documents GROUP BY collection"
+            ).fetchall())
+        for collection_name in self.COLLECTIONS:
+            token = self.get_resume_token(collection_name)
+            collections[collection_name] = {
+                "documents": counts.get(collection_name, 0),
+                "live": collection_name in self._live and self._is_watching(collection_name),
+                "staleness_seconds": self.staleness(collection_name),
+                "fresh": self.is_fresh(collection_name),
+                "resume_token": token.isoformat() if token else None,
+            }
+        return {
+            "enabled": True,
+            "path": self.path,
+            "max_staleness_seconds": self.max_staleness,
+            "sync_interval_seconds": self.sync_interval,
+            "collections": collections,
+        }
+
+
+@lru_cache()
+def get_replica() -> Optional[ReplicaService]:
+    """Get the local replica, or None when it is disabled."""
+    if not settings.REPLICA_ENABLED:
+        return None
+    return ReplicaService(
+        settings.REPLICA_PATH,
+        settings.REPLICA_MAX_STALENESS,
+        listen=settings.REPLICA_LISTEN,
+        sync_interval=settings.REPLICA_SYNC_INTERVAL,
+        reconcile_interval=settings.REPLICA_RECONCILE_INTERVAL,
+        clock_skew=settings.REPLICA_CLOCK_SKEW,
+    )
@@ -0,0 +1,266 @@
+"""Business logic for background report generation."""
+import itertools
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from google.cloud.firestore_v1 import FieldFilter
+from app.models.car import CarModel
+from app.models.staff import StaffModel
+from app.schemas.report import ReportCreate
+from app.services.report_writers import WRITERS
+from app.services.firestore_calls import firestore_calls
+from app.services.archive_service import ARCHIVE_COLLECTION, ARCHIVED_CARS_SUBCOLLECTION
+from app.config import get_db, settings
+
+REPORT_TITLES = {
+    "sales": "Sales Report",
+    "inventory": "Inventory Report",
+    "financial": "Financial Report",
+    "staff": "Staff Report",
+}
+
+PERIOD_LABELS = {
+    "week": "Weekly",
+    "month": "Monthly",
+    "quarter": "Quarterly",
+    "year": "Yearly",
+}
+
+
+class ReportJob:
+    """Report job state."""
+
+    def __init__(self, report_type: str, format: str, period: str):
+        self.id = uuid.uuid4().hex
+        self.report_type = report_type
+        self.format = format
+        self.period = period
+        self.status = "queued"
+        self.progress = 0.0
+        self.rows_written = 0
+        self.total_rows: Optional[int] = None
+        self.error: Optional[str] = None
+        self.path: Optional[str] = None
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def cache_key(self) -> Tuple[str, str, str]:
+        return (self.report_type, self.format, self.period)
+
+    @property
+    def filename(self) -> str:
+        return f"{self.report_type}_report_{self.period}.{self.format}"
+
+
+class ReportService:
+    """Service for running report jobs on a worker pool."""
+
+    def __init__(self):
+        self.db = get_db()
+        self.cars = self.db.collection(CarModel.COLLECTION_NAME)
+        self.staff = self.db.collection(StaffModel.COLLECTION_NAME)
+        self.output_dir = settings.REPORT_OUTPUT_DIR
+        self.cache_ttl = settings.REPORT_CACHE_TTL
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.REPORT_WORKERS,
+            thread_name_prefix="report",
+        )
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ReportJob] = {}
+        self._cache: Dict[Tuple[str, str, str], str] = {}
+
+    def submit(self, report_data: ReportCreate) -> Tuple[ReportJob, bool]:
+        """Submit a report job, reusing a cached or in-flight job with the same parameters.
+
+        Returns the job and whether it was served from the cache.
+        """
+        job = ReportJob(report_data.report_type, report_data.format, report_data.period)
+
+        with self._lock:
+            existing = self._jobs.get(self._cache.get(job.cache_key))
+            if existing and self._is_reusable(existing):
+                return existing, existing.status == "done"
+            if existing:
+                self._discard(existing)
+            self._jobs[job.id] = job
+            self._cache[job.cache_key] = job.id
+
+        self._executor.submit(self._run, job)
+        return job, False
+
+    def get_job(self, job_id: str) -> Optional[ReportJob]:
+        """Get report job by ID."""
+        return self._jobs.get(job_id)
+
+    def _is_reusable(self, job: ReportJob) -> bool:
+        if job.status in ("queued", "running"):
+            return True
+        if job.status != "done" or not job.path or not os.path.exists(job.path):
+            return False
+        return time.time() - job.finished_at.timestamp() <= self.cache_ttl
+
+    def _discard(self, job: ReportJob):
+        self._jobs.pop(job.id, None)
+        if job.path and os.path.exists(job.path):
+            os.remove(job.path)
+
+    def _run(self, job: ReportJob):
+        job.status = "running"
+        os.makedirs(self.output_dir, exist_ok=True)
+        job.path = os.path.join(self.output_dir, f"{job.id}.{job.format}")
+
+        try:
+            headers, rows = self._build_rows(job)
+            writer = WRITERS[job.format](job.path)
+            try:
+                writer.write_header(
+                    REPORT_TITLES[job.report_type],
+                    [
+                        f"Period: {PERIOD_LABELS[job.period]}",
+                        f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+                    ],
+                    headers,
+                )
+                for row in rows:
+                    writer.write_row(row)
+                    job.rows_written += 1
+                    if job.total_rows:
+                        job.progress = min(job.rows_written / job.total_rows, 0.99)
+            finally:
+                writer.close()
+        except Exception as exc:
+            job.status = "failed"
+            job.error = str(exc)
+        else:
+            job.status = "done"
+            job.progress = 1.0
+        job.finished_at = datetime.now()
+
+    def _count(self, query) -> Optional[int]:
+        """Estimate the number of matching documents with an aggregation query."""
+        try:
+            result = firestore_calls.query("reports.count", lambda **kw: query.count().get(**kw))
+            return int(result[0][0].value)
+        except Exception:
+            return None
+
+    def _build_rows(self, job: ReportJob) -> Tuple[Sequence[str], Iterable[Sequence]]:
+        if job.report_type == "sales":
+            # Old sales live in the archive partitions
+            query = self.cars.where(filter=FieldFilter("status", "==", "sold"))
+            archived = self.db.collection_group(ARCHIVED_CARS_SUBCOLLECTION)
+            counts = [self._count(query), self._count(archived)]
+            job.total_rows = None if None in counts else sum(counts)
+            return (
+                ["Date", "Car", "VIN", "Purchase", "Sale", "Profit"],
+                itertools.chain(self._sales_rows(query), self._sales_rows(archived)),
+            )
+
+        if job.report_type == "inventory":
+            query = self.cars.where(filter=FieldFilter("status", "in", ["available", "reserved"]))
+            job.total_rows = self._count(query)
+            return (
+                ["Brand", "Model", "Year", "VIN", "Purchase Price", "Selling Price", "Status"],
+                self._inventory_rows(query),
+            )
+
+        if job.report_type == "financial":
+            return (
+                ["Status", "Quantity", "Purchased", "Sold", "Profit"],
+                self._financial_rows(job),
+            )
+
+        job.total_rows = self._count(self.staff)
+        return (
+            ["Employee", "Phone", "Email", "City", "Status"],
+            self._staff_rows(self.staff),
+        )
+
+    def _sales_rows(self, query) -> Iterable[List]:
+        for doc in firestore_calls.iter_query("reports.sales", query):
+            data = doc.to_dict()
+            purchase = data.get("purchasePrice", 0.0) or 0.0
+            selling = data.get("sellingPrice", 0.0) or 0.0
+            date = data.get("soldDate") or data.get("arrivalDate")
+            yield [
+                date.strftime("%Y-%m-%d") if isinstance(date, datetime) else (date or "N/A"),
+                f"{data.get('brand', '')} {data.get('model', '')}".strip(),
+                data.get("vin") or "N/A",
+                purchase,
+                selling,
+                selling - purchase,
+            ]
+
+    def _inventory_rows(self, query) -> Iterable[List]:
+        for doc in firestore_calls.iter_query("reports.inventory", query):
+            data = doc.to_dict()
+            yield [
+                data.get("brand", ""),
+                data.get("model", ""),
+                data.get("year", 0),
+                data.get("vin") or "N/A",
+                data.get("purchasePrice", 0.0),
+                data.get("sellingPrice", 0.0),
+                data.get("status", "available"),
+            ]
+
+    def _financial_rows(self, job: ReportJob) -> Iterable[List]:
+        # Aggregate while streaming so only per-status totals are kept in memory
+        by_status: Dict[str, Dict[str, float]] = {}
+        query = self.cars.select(["status", "purchasePrice", "sellingPrice"])
+        for doc in firestore_calls.iter_query("reports.financial", query):
+            data = doc.to_dict()
+            totals = by_status.setdefault(
+                data.get("status") or "unknown",
+                {"count": 0, "purchase": 0.0, "selling": 0.0},
+            )
+            totals["count"] += 1
+            totals["purchase"] += data.get("purchasePrice", 0.0) or 0.0
+            totals["selling"] += data.get("sellingPrice", 0.0) or 0.0
+
+        # Archived cars are all sold; add them from the monthly rollups
+        archived = {"count": 0, "purchase": 0.0, "selling": 0.0}
+        for doc in firestore_calls.iter_query("reports.rollups", self.db.collection(ARCHIVE_COLLECTION)):
+            data = doc.to_dict()
+            archived["count"] += data.get("count", 0) or 0
+            archived["purchase"] += data.get("totalPurchase", 0.0) or 0.0
+            archived["selling"] += data.get("totalSelling", 0.0) or 0.0
+        if archived["count"]:
+            totals = by_status.setdefault("sold", {"count": 0, "purchase": 0.0, "selling": 0.0})
+            for field, value in archived.items():
+                totals[field] += value
+
+        job.total_rows = len(by_status) + 1
+        for status, totals in by_status.items():
+            yield [
+                status,
+                totals["count"],
+                totals["purchase"],
+                totals["selling"],
+                totals["selling"] - totals["purchase"],
+            ]
+
+        sold = by_status.get("sold", {"purchase": 0.0, "selling": 0.0})
+        yield [
+            "TOTAL",
+            sum(totals["count"] for totals in by_status.values()),
+            sum(totals["purchase"] for totals in by_status.values()),
+            sold["selling"],
+            sold["selling"] - sold["purchase"],
+        ]
+
+    def _staff_rows(self, query) -> Iterable[List]:
+        for doc in firestore_calls.iter_query("reports.staff", query):
+            data = doc.to_dict()
+            yield [
+                data.get("name") or "N/A",
+                data.get("phone") or "N/A",
+                data.get("email") or "N/A",
+                data.get("city") or "N/A",
+                data.get("status", "active"),
+            ]
@@ -0,0 +1,114 @@
+"""Incremental report writers for CSV, XLSX and PDF output."""
+import csv
+from typing import List, Sequence
+
+
+class CsvReportWriter:
+    """Write report rows to a CSV file as they arrive."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.writer(self._file)
+
+    def write_header(self, title: str, meta: List[str], headers: Sequence[str]):
+        self._writer.writerow([title])
+        for line in meta:
+            self._writer.writerow([line])
+        self._writer.writerow([])
+        self._writer.writerow(headers)
+
+    def write_row(self, row: Sequence):
+        self._writer.writerow(row)
+
+    def close(self):
+        self._file.close()
+
+
+class XlsxReportWriter:
+    """Write report rows to an XLSX file using openpyxl's write-only mode."""
+
+    def __init__(self, path: str):
+        from openpyxl import Workbook
+
+        self.path = path
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("Report")
+
+    def write_header(self, title: str, meta: List[str], headers: Sequence[str]):
+        self._sheet.append([title])
+        for line in meta:
+            self._sheet.append([line])
+        self._sheet.append([])
+        self._sheet.append(list(headers))
+
+    def write_row(self, row: Sequence):
+        self._sheet.append(list(row))
+
+    def close(self):
+        self._workbook.save(self.path)
+
+
+class PdfReportWriter:
+    """Write report rows to a PDF file page by page using reportlab."""
+
+    PAGE_MARGIN = 40
+    ROW_HEIGHT = 14
+    FONT_SIZE = 8
+
+    def __init__(self, path: str):
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.pdfgen import canvas
+
+        self._canvas = canvas.Canvas(path, pagesize=landscape(A4))
+        self._width, self._height = landscape(A4)
+        self._headers: Sequence[str] = []
+        self._y = self._height - self.PAGE_MARGIN
+
+    def _column_x(self, index: int) -> float:
+        usable = self._width - 2 * self.PAGE_MARGIN
+        return self.PAGE_MARGIN + index * usable / max(len(self._headers), 1)
+
+    def _draw_row(self, row: Sequence, bold: bool = False):
+        font = "Helvetica-Bold" if bold else "Helvetica"
+        self._canvas.setFont(font, self.FONT_SIZE)
+        for index, value in enumerate(row):
+            self._canvas.drawString(self._column_x(index), self._y, str(value))
+        self._y -= self.ROW_HEIGHT
+
+    def _new_page(self):
+        self._canvas.showPage()
+        self._y = self._height - self.PAGE_MARGIN
+        self._draw_row(self._headers, bold=True)
+
+    def write_header(self, title: str, meta: List[str], headers: Sequence[str]):
+        self._headers = headers
+        self._canvas.setFont("Helvetica-Bold", 16)
+        self._canvas.drawString(self.PAGE_MARGIN, self._y, title)
+        self._y -= 24
+        self._canvas.setFont("Helvetica", 10)
+        for line in meta:
+            self._canvas.drawString(self.PAGE_MARGIN, self._y, line)
+            self._y -= 14
+        self._y -= 10
+        self._draw_row(headers, bold=True)
+
+    def write_row(self, row: Sequence):
+        if self._y < self.PAGE_MARGIN:
+            self._new_page()
+        self._draw_row(row)
+
+    def close(self):
+        self._canvas.save()
+
+
+WRITERS = {
+    "csv": CsvReportWriter,
+    "xlsx": XlsxReportWriter,
+    "pdf": PdfReportWriter,
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+}
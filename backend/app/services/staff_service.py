@@ -1,9 +1,18 @@
 """Business logic for staff operations."""
-from typing import List, Optional
-from google.cloud.firestore_v1 import FieldFilter
+from typing import Dict, List, Optional, Tuple
+from google.cloud.firestore_v1 import FieldFilter, SERVER_TIMESTAMP
 from app.models.staff import StaffModel
+from app.models.car import CarModel
 from app.schemas.staff import StaffCreate, StaffUpdate
 from app.config import get_db
+from app.services.replica_service import get_replica, UPDATED_AT_FIELD
+from app.services.firestore_calls import firestore_calls
+
+# Firestore accepts at most 30 values in an `in` filter
+IN_QUERY_MAX_VALUES = 30
+
+# Above this many `in` chunks a single scan of the cars collection is cheaper
+MAX_IN_QUERIES = 3
 
 class StaffService:
     """Service for managing staff members."""
@@ -11,6 +20,7 @@ class StaffService:
     def __init__(self):
         self.db = get_db()
         self.collection = self.db.collection(StaffModel.COLLECTION_NAME)
+        self.replica = get_replica()
     
     async def create_staff(self, staff_data: StaffCreate) -> StaffModel:
         """Create a new staff member."""
@@ -24,14 +34,18 @@ class StaffService:
         )
         
         doc_ref = self.collection.document()
-        doc_ref.set(staff.to_dict())
+        data = {**staff.to_dict(), UPDATED_AT_FIELD: SERVER_TIMESTAMP}
+        await firestore_calls.awrite("staff.create", lambda **kw: doc_ref.set(data, **kw))
         staff.id = doc_ref.id
         
+        if self.replica:
+            self.replica.upsert(StaffModel.COLLECTION_NAME, staff.id, staff.to_dict())
+        
         return staff
     
     async def get_staff_by_id(self, staff_id: str) -> Optional[StaffModel]:
         """Get staff member by ID."""
-        doc = self.collection.document(staff_id).get()
+        doc = await firestore_calls.aread("staff.get", self.collection.document(staff_id).get, hedge=True)
         if not doc.exists:
             return None
         return StaffModel.from_dict(doc.to_dict(), staff_id)
@@ -42,6 +56,14 @@ class StaffService:
         status: Optional[str] = None
     ) -> List[StaffModel]:
         """Get all staff members with optional filtering."""
+        if self.replica and self.replica.is_fresh(StaffModel.COLLECTION_NAME):
+            docs = self.replica.query(
+                StaffModel.COLLECTION_NAME,
+                {"status": status} if status else None,
+                limit,
+            )
+            return [StaffModel.from_dict(data, doc_id) for doc_id, data in docs]
+        
         query = self.collection
         
         if status:
@@ -50,7 +72,7 @@ class StaffService:
         if limit:
             query = query.limit(limit)
         
-        docs = query.stream()
+        docs = await firestore_calls.aquery("staff.list", lambda **kw: list(query.stream(**kw)))
         return [StaffModel.from_dict(doc.to_dict(), doc.id) for doc in docs]
     
     async def update_staff(
@@ -60,7 +82,7 @@ class StaffService:
     ) -> Optional[StaffModel]:
         """Update staff member."""
         doc_ref = self.collection.document(staff_id)
-        doc = doc_ref.get()
+        doc = await firestore_calls.aread("staff.get", doc_ref.get)
         
         if not doc.exists:
             return None
@@ -84,20 +106,25 @@ class StaffService:
             firestore_data[firestore_key] = value
         
         if firestore_data:
-            doc_ref.update(firestore_data)
+            firestore_data[UPDATED_AT_FIELD] = SERVER_TIMESTAMP
+            await firestore_calls.awrite("staff.update", lambda **kw: doc_ref.update(firestore_data, **kw))
         
-        updated_doc = doc_ref.get()
+        updated_doc = await firestore_calls.aread("staff.get", doc_ref.get)
+        if self.replica:
+            self.replica.upsert(StaffModel.COLLECTION_NAME, staff_id, updated_doc.to_dict())
         return StaffModel.from_dict(updated_doc.to_dict(), staff_id)
     
     async def delete_staff(self, staff_id: str) -> bool:
         """Delete staff member."""
         doc_ref = self.collection.document(staff_id)
-        doc = doc_ref.get()
+        doc = await firestore_calls.aread("staff.get", doc_ref.get)
         
         if not doc.exists:
             return False
         
-        doc_ref.delete()
+        await firestore_calls.awrite("staff.delete", doc_ref.delete)
+        if self.replica:
+            self.replica.delete(StaffModel.COLLECTION_NAME, staff_id)
         return True
     
     async def search_staff(self, query: str) -> List[StaffModel]:
@@ -118,3 +145,64 @@ class StaffService:
                 results.append(staff)
         
         return results
+    
+    async def get_staff_with_cars(
+        self,
+        limit: Optional[int] = None,
+        status: Optional[str] = None
+    ) -> List[Tuple[StaffModel, List[CarModel]]]:
+        """Get staff members together with the cars they manage.
+        
+        Cars are fetched with a few `in`-batched queries when the staff list is
+        small, otherwise with one scan of the cars collection, and grouped in
+        memory. A car's `managerId` takes precedence over its `manager` name.
+        """
+        staff_list = await self.get_all_staff(limit=limit, status=status)
+        cars = self.db.collection(CarModel.COLLECTION_NAME)
+        
+        staff_ids = [staff.id for staff in staff_list]
+        names = list({staff.name for staff in staff_list if staff.name})
+        chunks = [
+            (field, values[start:start + IN_QUERY_MAX_VALUES])
+            for field, values in (("managerId", staff_ids), ("manager", names))
+            for start in range(0, len(values), IN_QUERY_MAX_VALUES)
+        ]
+        
+        if len(chunks) <= 2 * MAX_IN_QUERIES:
+            queries = [
+                cars.where(filter=FieldFilter(field, "in", values))
+                for field, values in chunks
+            ]
+        else:
+            queries = [cars]
+        
+        found: Dict[str, CarModel] = {}
+        for query in queries:
+            async for doc in firestore_calls.aiter_query("staff.assigned_cars", query):
+                found[doc.id] = CarModel.from_dict(doc.to_dict(), doc.id)
+        
+        by_id: Dict[str, List[CarModel]] = {}
+        by_name: Dict[str, List[CarModel]] = {}
+        for car in found.values():
+            if car.manager_id:
+                by_id.setdefault(car.manager_id, []).append(car)
+            elif car.manager:
+                by_name.setdefault(car.manager, []).append(car)
+        
+        return [
+            (staff, by_id.get(staff.id, []) + by_name.get(staff.name, []))
+            for staff in staff_list
+        ]
+    
+    @staticmethod
+    def summarize_cars(cars: List[CarModel]) -> dict:
+        """Summarize a manager's cars by status and price totals."""
+        by_status: Dict[str, int] = {}
+        for car in cars:
+            by_status[car.status] = by_status.get(car.status, 0) + 1
+        return {
+            "total": len(cars),
+            "by_status": by_status,
+            "total_purchase": sum(car.purchase_price or 0.0 for car in cars),
+            "total_selling": sum(car.selling_price or 0.0 for car in cars),
+        }
@@ -0,0 +1,84 @@
+"""Benchmark Firestore call policies against injected slow and failing responses.
+
+Runs the same simulated point read with and without hedging and prints
+latency percentiles, retry and hedge counts. No Firestore access is needed:
+
+    python benchmarks/firestore_hedging.py
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.api_core import exceptions
+from app.services.firestore_calls import FirestoreCaller
+
+CALLS = 400
+FAST_LATENCY = 0.005
+SLOW_LATENCY = 0.25
+SLOW_RATE = 0.03
+ERROR_RATE = 0.02
+
+
+def simulated_read(retry=None, timeout=None):
+    """Point read that is occasionally very slow or fails transiently."""
+    if random.random() < ERROR_RATE:
+        raise exceptions.ServiceUnavailable("injected failure")
+    latency = SLOW_LATENCY if random.random() < SLOW_RATE else FAST_LATENCY
+    time.sleep(min(latency, timeout))
+    if latency > timeout:
+        raise exceptions.DeadlineExceeded("injected timeout")
+    return {"ok": True}
+
+
+async def run(hedge: bool) -> dict:
+    caller = FirestoreCaller(
+        read_deadline=2.0,
+        query_deadline=2.0,
+        write_deadline=2.0,
+        max_attempts=4,
+        backoff_base=0.01,
+        backoff_max=0.1,
+        hedge_enabled=hedge,
+        hedge_default_delay=0.02,
+    )
+    latencies = []
+    for _ in range(CALLS):
+        started = time.monotonic()
+        await caller.aread("bench.get", simulated_read, hedge=True)
+        latencies.append(time.monotonic() - started)
+
+    latencies.sort()
+    stats = caller.get_stats()
+    return {
+        "p50_ms": latencies[int(CALLS * 0.50)] * 1000,
+        "p95_ms": latencies[int(CALLS * 0.95)] * 1000,
+        "p99_ms": latencies[int(CALLS * 0.99)] * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "retries": stats["retries"],
+        "hedges": stats["hedges"],
+        "hedge_wins": stats["hedge_wins"],
+    }
+
+
+def main():
+    random.seed(7)
+    print(
+        f"{CALLS} reads, {SLOW_RATE:.0%} slow ({SLOW_LATENCY * 1000:.0f} ms), "
+        f"{ERROR_RATE:.0%} transient errors"
+    )
+    print(f"{'policy':<16}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'retries':>9}{'hedges':>8}{'wins':>6}")
+    for name, hedge in (("retry only", False), ("retry + hedge", True)):
+        result = asyncio.run(run(hedge))
+        print(
+            f"{name:<16}{result['p50_ms']:>7.1f}ms{result['p95_ms']:>7.1f}ms"
+            f"{result['p99_ms']:>7.1f}ms{result['max_ms']:>7.1f}ms"
+            f"{result['retries']:>9}{result['hedges']:>8}{result['hedge_wins']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
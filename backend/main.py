@@ -1,11 +1,27 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from google.api_core import exceptions as google_exceptions
 from app.config.firebase import initialize_firebase
-from app.routes import staff_router, car_router
+from app.middleware import AdmissionMiddleware
+from app.routes import (
+    staff_router,
+    car_router,
+    replica_router,
+    report_router,
+    metrics_router,
+    archive_router,
+)
+from app.services.replica_service import get_replica
 
 # Initialize Firebase
 initialize_firebase()
 
+# Warm-start the local read replica, if enabled
+replica = get_replica()
+if replica:
+    replica.start()
+
 # Create FastAPI app
 app = FastAPI(
     title="AutoKorea API",
@@ -13,6 +29,10 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Admission control: rate limiting, concurrency caps and load shedding.
+# Added before CORS so that shed responses still carry CORS headers.
+app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,9 +42,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Firestore errors left over after retries are reported as temporary outages
+@app.exception_handler(google_exceptions.DeadlineExceeded)
+async def firestore_deadline_handler(request: Request, exc: google_exceptions.DeadlineExceeded):
+    return JSONResponse({"detail": "Database request timed out"}, status_code=504)
+
+@app.exception_handler(google_exceptions.ServiceUnavailable)
+@app.exception_handler(google_exceptions.TooManyRequests)
+async def firestore_unavailable_handler(request: Request, exc: google_exceptions.GoogleAPICallError):
+    return JSONResponse(
+        {"detail": "Database temporarily unavailable"},
+        status_code=503,
+        headers={"Retry-After": "1"},
+    )
+
 # Include routers
 app.include_router(staff_router)
 app.include_router(car_router)
+app.include_router(replica_router)
+app.include_router(report_router)
+app.include_router(metrics_router)
+app.include_router(archive_router)
 
 # Health check route
 @app.get("/")